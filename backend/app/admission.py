@@ -0,0 +1,88 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from app.metrics import metrics
+from app.settings import settings
+
+
+class AdmissionTimeout(Exception):
+    """Raised when a request waited too long for a chat slot."""
+
+
+class AdmissionController:
+    """
+    Caps how many chat turns run at once in this worker.
+
+    Every turn (interactive or batch) holds one of `limit` slots while it runs.
+    Batch turns must also hold one of `batch_limit` slots, which is kept below
+    `limit`, so batch jobs can never take all capacity from interactive users.
+
+    Raises:
+        ValueError: If limit is below 2 (no room for batch and interactive turns)
+    """
+
+    def __init__(self, limit: int, batch_limit: int):
+        if limit < 2:
+            raise ValueError(f"Chat concurrency limit must be at least 2, got {limit}")
+        self.limit = limit
+        self.batch_limit = max(1, min(batch_limit, limit - 1))
+        self._slots = asyncio.Semaphore(self.limit)
+        self._batch_slots = asyncio.Semaphore(self.batch_limit)
+        self._active = {"interactive": 0, "batch": 0}
+        self._waiting = {"interactive": 0, "batch": 0}
+
+    @asynccontextmanager
+    async def slot(self, batch: bool = False, timeout: float | None = None):
+        """
+        Hold a chat slot for the duration of the block.
+
+        Args:
+            batch: Whether the turn belongs to a batch job
+            timeout: Seconds to wait for a slot (None waits indefinitely)
+
+        Raises:
+            AdmissionTimeout: If no slot freed up in time
+        """
+        kind = "batch" if batch else "interactive"
+        start = time.perf_counter()
+        self._waiting[kind] += 1
+        acquired = []
+        try:
+            try:
+                async with asyncio.timeout(timeout):
+                    if batch:
+                        await self._batch_slots.acquire()
+                        acquired.append(self._batch_slots)
+                    await self._slots.acquire()
+                    acquired.append(self._slots)
+            except TimeoutError:
+                metrics.increment(f"admission.{kind}.rejected")
+                raise AdmissionTimeout(f"No chat slot available after {timeout:g}s") from None
+        finally:
+            self._waiting[kind] -= 1
+            # A cancelled or timed-out wait may have taken the batch slot already
+            if len(acquired) < (2 if batch else 1):
+                for semaphore in acquired:
+                    semaphore.release()
+
+        metrics.observe(f"admission.{kind}.wait", time.perf_counter() - start)
+        self._active[kind] += 1
+        try:
+            yield
+        finally:
+            self._active[kind] -= 1
+            for semaphore in acquired:
+                semaphore.release()
+
+    def snapshot(self) -> dict:
+        """Current limits, running turns and queued requests."""
+        return {
+            "limit": self.limit,
+            "batch_limit": self.batch_limit,
+            "active": dict(self._active),
+            "waiting": dict(self._waiting),
+        }
+
+
+admission = AdmissionController(settings.CHAT_MAX_CONCURRENCY, settings.BATCH_MAX_CONCURRENCY)
@@ -1,14 +1,25 @@
-from typing import AsyncGenerator
+import asyncio
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import TYPE_CHECKING, AsyncGenerator
 
-from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langgraph.prebuilt import create_react_agent
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
-from app.db.session_manager import get_session_history
+from app.agents.router import ROUTED_REPLY_NAME, Route, is_coffee_question, render_template, route_message
+from app.agents.summarizer import build_context, schedule_summary_update
+from app.db.session_manager import get_session_history, get_session_summary
+from app.metrics import metrics
 from app.settings import settings
-from app.tools.places_tool import find_coffee_shops
-from app.tools.rag_tool import search_coffee_knowledge
+from app.tools.places_tool import find_coffee_shops, format_coffee_shops, search_coffee_shops
+from app.tools.rag_tool import retrieve_documents, search_coffee_knowledge
 from app.tools.search_tool import search_web
+from app.tools.speculation import finish_speculation, start_speculation
+from app.tracing import tracer
+
+# Gemini and LangGraph are imported lazily so importing the app stays cheap
+if TYPE_CHECKING:
+    from langchain_google_genai import ChatGoogleGenerativeAI
 
 SYSTEM_PROMPT = """You are a helpful assistant specialized in Brazilian coffee.
 You have access to a comprehensive knowledge base about:
@@ -45,8 +56,18 @@ You have access to a comprehensive knowledge base about:
 """
 
 
-def get_llm() -> ChatGoogleGenerativeAI:
+@dataclass
+class TurnStats:
+    """How a chat turn was answered, filled in by chat() as it runs."""
+
+    route: str | None = None  # Pre-router kind, or "agent"
+    tools: list[str] = field(default_factory=list)  # Tools the agent called, in order
+
+
+def get_llm() -> "ChatGoogleGenerativeAI":
     """Get the Gemini LLM instance."""
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
     return ChatGoogleGenerativeAI(
         model="gemini-3-pro-preview",
         google_api_key=settings.GOOGLE_API_KEY,
@@ -70,6 +91,8 @@ def get_tools() -> list:
 
 def create_coffee_agent():
     """Create the coffee chatbot agent with all tools."""
+    from langgraph.prebuilt import create_react_agent
+
     llm = get_llm()
     tools = get_tools()
 
@@ -82,16 +105,55 @@ def create_coffee_agent():
     return agent
 
 
-async def chat(message: str, session_id: str) -> AsyncGenerator[str, None]:
+@lru_cache(maxsize=1)
+def get_coffee_agent():
+    """
+    Get the coffee agent (cached).
+    The compiled graph holds no per-session state, so a single instance per
+    process is shared by every request instead of being rebuilt each turn.
+    """
+    return create_coffee_agent()
+
+
+async def answer_routed(route: Route) -> str | None:
+    """
+    Answer a short-circuited route without calling the LLM.
+
+    Args:
+        route: Routing decision from the pre-router
+
+    Returns:
+        Reply text, or None if the agent should handle the message after all
+    """
+    if route.kind != "places":
+        return render_template(route)
+
+    try:
+        places = await asyncio.to_thread(search_coffee_shops, route.location)
+    except Exception:
+        # Let the agent deal with Places failures the way it always has
+        return None
+    if not places:
+        # Often a misread location; the agent can rephrase or answer the question itself
+        return None
+    return render_template(route, format_coffee_shops(places))
+
+
+async def chat(message: str, session_id: str, stats: TurnStats | None = None) -> AsyncGenerator[str, None]:
     """
     Chat with the coffee agent using session history.
     
     Streams response chunks directly from the model as they are generated,
-    providing true real-time streaming without buffering.
+    providing true real-time streaming without buffering. Greetings, off-topic
+    questions and simple coffee-shop lookups are answered by the pre-router
+    without calling the LLM. With SPECULATIVE_RETRIEVAL enabled, coffee
+    questions start their knowledge-base search alongside the first LLM call.
+    Every turn is traced; errored, slow and head-sampled traces are exported.
 
     Args:
         message: User's message
         session_id: Session ID for history management
+        stats: Receives the route taken and the tools called, if given
 
     Yields:
         Streamed response chunks directly from the LLM
@@ -101,22 +163,54 @@ async def chat(message: str, session_id: str) -> AsyncGenerator[str, None]:
     """
     import logging
     logger = logging.getLogger(__name__)
-    
+
+    trace = tracer.start_trace("chat", session_id=session_id)
+    error = None
     try:
-        agent = create_coffee_agent()
+        start = time.perf_counter()
+
+        if settings.ROUTER_ENABLED:
+            with trace.span("router") as span, get_session_history(session_id) as history_manager:
+                route = route_message(
+                    message,
+                    has_history=lambda: history_manager.has_replies(excluding_name=ROUTED_REPLY_NAME),
+                )
+                reply = await answer_routed(route) if route.kind != "agent" else None
+                span.set(route=route.kind, short_circuited=reply is not None)
+            if reply is not None:
+                if stats is not None:
+                    stats.route = route.kind
+                trace.set(route=route.kind)
+                yield reply
 
-        # Use context manager to properly manage database connection
+                with trace.span("history.save"), get_session_history(session_id) as history_manager:
+                    history_manager.add_messages(
+                        [HumanMessage(content=message), AIMessage(content=reply, name=ROUTED_REPLY_NAME)]
+                    )
+
+                metrics.increment("router.short_circuited")
+                metrics.increment(f"router.route.{route.kind}")
+                metrics.observe("router.routed_turn", time.perf_counter() - start)
+                return
+
+        agent = get_coffee_agent()
+        if stats is not None:
+            stats.route = "agent"
+        trace.set(route="agent")
+
+        if settings.SPECULATIVE_RETRIEVAL and is_coffee_question(message):
+            start_speculation(message, lambda: retrieve_documents(message))
+
+        # History manager for this session (borrows pooled connections per operation)
         with get_session_history(session_id) as history_manager:
-            # Get history from database
-            chat_history: list[BaseMessage] = history_manager.messages
+            with trace.span("history.load") as span:
+                # Get the recent messages (from this worker's cache when it served the last turn)
+                window = history_manager.recent()
 
-            # Build messages with context
-            # Only use last 4 messages if there are more than 2 messages for context
-            messages = []
-            if chat_history and len(chat_history) >= 2:
-                # Get last 4 messages (2 exchanges)
-                context_messages = chat_history[-4:]
-                messages.extend(context_messages)
+                # Build messages with context: running summary + recent window, under a token budget
+                summary = get_session_summary(session_id) if settings.SUMMARY_ENABLED else None
+                messages = build_context(window.messages, summary, window.offset)
+                span.set(stored_messages=window.total, context_messages=len(messages))
 
             # Add current user message
             messages.append(HumanMessage(content=message))
@@ -124,9 +218,11 @@ async def chat(message: str, session_id: str) -> AsyncGenerator[str, None]:
             # Stream response directly from agent using astream
             # Filter to only stream the FINAL AI response, not intermediate tool results
             response_parts = []
+            agent_span = trace.start_span("agent")
             
             async for chunk in agent.astream(
                 {"messages": messages},
+                config={"callbacks": trace.callbacks(agent_span)},
                 stream_mode="messages",  # Stream message chunks directly
             ):
                 # Extract content from the message chunk
@@ -142,6 +238,8 @@ async def chat(message: str, session_id: str) -> AsyncGenerator[str, None]:
                 
                 # Skip tool messages (intermediate results from tools)
                 if isinstance(msg, ToolMessage):
+                    if stats is not None:
+                        stats.tools.append(msg.name)
                     continue
                 
                 # Only process AI messages (final response from LLM after using tools)
@@ -168,31 +266,45 @@ async def chat(message: str, session_id: str) -> AsyncGenerator[str, None]:
                                 response_parts.append(item)
                                 yield item  # Yield immediately
 
+            agent_span.end()
+
             # Save messages to history after streaming completes
             complete_response = "".join(response_parts)
             if complete_response:  # Only save if we got a response
-                history_manager.add_user_message(message)
-                history_manager.add_ai_message(complete_response)
-            # Connection automatically returned to pool when context exits
+                with trace.span("history.save"):
+                    history_manager.add_messages(
+                        [HumanMessage(content=message), AIMessage(content=complete_response)]
+                    )
+
+        if complete_response and settings.SUMMARY_ENABLED:
+            schedule_summary_update(session_id)
+
+        metrics.increment("router.agent")
+        metrics.observe("router.agent_turn", time.perf_counter() - start)
             
     except Exception as e:
+        error = e
         logger.error(f"Error in chat for session {session_id}: {str(e)}", exc_info=True)
         raise
+    finally:
+        finish_speculation()
+        tracer.end_trace(trace, error)
 
 
-async def chat_simple(message: str, session_id: str) -> str:
+async def chat_simple(message: str, session_id: str, stats: TurnStats | None = None) -> str:
     """
     Non-streaming chat with the coffee agent.
 
     Args:
         message: User's message
         session_id: Session ID for history management
+        stats: Receives the route taken and the tools called, if given
 
     Returns:
         Complete response
     """
     response_parts = []
-    async for chunk in chat(message, session_id):
+    async for chunk in chat(message, session_id, stats):
         response_parts.append(chunk)
 
     return "".join(response_parts)
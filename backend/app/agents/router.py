@@ -0,0 +1,329 @@
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Callable
+
+from app.metrics import metrics
+from app.settings import settings
+
+# Any of these means the message is about coffee and must reach the agent
+COFFEE_TERMS = {
+    "cafe", "cafes", "coffee", "coffees", "espresso", "expresso", "barista", "cafeteria",
+    "cafeterias", "torra", "torrefacao", "torrado", "roast", "roasting", "roasted", "grao",
+    "graos", "bean", "beans", "arabica", "robusta", "conilon", "moagem", "moido", "grind",
+    "brew", "brewing", "coado", "coar", "filtro", "prensa", "latte", "cappuccino", "mocha",
+    "cafeina", "caffeine", "safra", "colheita", "harvest", "lavoura", "cafeicultura",
+    "cafezal", "aram", "cerrado", "mogiana", "especial", "specialty", "cupping", "pour",
+    "chemex", "v60", "aeropress", "moka",
+}
+
+# Off-topic vocabulary, mapped to how the topic is named in each language. Words that
+# also come up in coffee conversations (presidente/governo in coffee history, copa as
+# the tree canopy, manga/maca as ambiguous Portuguese) are deliberately left out.
+OFF_TOPIC_TERMS = {
+    "fruits": {
+        "terms": {"mango", "banana", "abacaxi", "pineapple", "apple", "laranja", "orange",
+                  "uva", "grape", "morango", "strawberry", "fruta", "frutas", "fruit"},
+        "pt": "frutas",
+        "en": "fruits",
+    },
+    "animals": {
+        "terms": {"macaco", "macacos", "monkey", "monkeys", "cachorro", "dog", "dogs", "gato",
+                  "cat", "cats", "leao", "lion", "elefante", "elephant", "animal", "animais",
+                  "animals"},
+        "pt": "animais",
+        "en": "animals",
+    },
+    "politics": {
+        "terms": {"politica", "politico", "politics", "political", "eleicao", "eleicoes",
+                  "election", "elections", "partido", "senado", "senate", "congresso", "congress",
+                  "lula", "bolsonaro"},
+        "pt": "política",
+        "en": "politics",
+    },
+    "sports": {
+        "terms": {"futebol", "football", "soccer", "basquete", "basketball", "volei",
+                  "volleyball", "tenis", "tennis", "campeonato", "championship",
+                  "flamengo", "corinthians", "palmeiras", "neymar", "esporte", "esportes",
+                  "sport", "sports"},
+        "pt": "esportes",
+        "en": "sports",
+    },
+}
+
+GREETING_PHRASES = {
+    "greeting": {
+        "oi", "ola", "opa", "eai", "e ai", "bom dia", "boa tarde", "boa noite", "tudo bem",
+        "tudo bom", "como vai", "hi", "hello", "hey", "good morning", "good afternoon",
+        "good evening", "how are you",
+    },
+    "thanks": {
+        "obrigado", "obrigada", "valeu", "muito obrigado", "muito obrigada", "thanks",
+        "thank you", "thanks a lot", "thx",
+    },
+}
+
+PORTUGUESE_MARKERS = {
+    "o", "a", "os", "as", "que", "de", "do", "da", "nao", "voce", "como", "onde", "e", "para",
+    "um", "uma", "com", "em", "no", "na", "posso", "qual", "quais", "sobre", "me", "fale",
+    "oi", "ola", "obrigado", "obrigada", "valeu", "bom", "boa", "tudo", "quero", "eu",
+}
+
+ENGLISH_MARKERS = {
+    "the", "is", "are", "what", "where", "how", "can", "i", "you", "to", "of", "and", "in",
+    "do", "does", "about", "tell", "me", "hi", "hello", "hey", "thanks", "thank", "good",
+    "want", "which", "my",
+}
+
+# "Where can I buy coffee in X" style questions, answered straight from Places
+PLACES_PATTERNS = [
+    re.compile(
+        r"^\s*onde\s+(?:eu\s+)?(?:posso|d[aá]\s+pra|consigo|devo|tem|h[aá]|encontro|compro|tomo)?\s*"
+        r"(?:comprar|tomar|beber|encontrar|achar)?\s*(?:um|uma|bons?|boas?)?\s*"
+        r"(?:caf[eé]s?|cafeterias?)(?:\s+especia(?:l|is))?\s+"
+        r"(?:em|no|na|nos|nas|perto\s+de)\s+(?P<location>.+)$",
+        re.IGNORECASE,
+    ),
+    re.compile(
+        r"^\s*(?:(?:me\s+)?(?:indique|recomende|sugira)\s+)?(?:as\s+)?(?:melhores\s+)?"
+        r"(?:cafeterias?|caf[eé]s)\s+(?:em|no|na|perto\s+de)\s+(?P<location>.+)$",
+        re.IGNORECASE,
+    ),
+    re.compile(
+        r"^\s*where\s+(?:can\s+i|could\s+i|do\s+i|should\s+i|to|is\s+there\s+a)?\s*"
+        r"(?:buy|get|find|drink|have)?\s*(?:some|a|good)?\s*"
+        r"(?:coffee|espresso|coffee\s+shops?|cafes?|caf[eé]s?)(?:\s+beans)?\s+"
+        r"(?:in|near|around|at)\s+(?P<location>.+)$",
+        re.IGNORECASE,
+    ),
+    re.compile(
+        r"^\s*(?:(?:find|recommend|suggest)\s+(?:me\s+)?)?(?:the\s+)?(?:best\s+)?(?:good\s+)?"
+        r"(?:coffee\s+shops?|cafes|caf[eé]s|coffeehouses?)\s+(?:in|near|around)\s+(?P<location>.+)$",
+        re.IGNORECASE,
+    ),
+]
+
+# Words that show a captured "location" is really the rest of a coffee question
+# ("café em grão ou moído?", "coffee in bulk", "in Brazil during harvest season")
+NON_LOCATION_TERMS = {
+    "ou", "or", "e", "and", "durante", "during", "quando", "when", "epoca", "estacao",
+    "season", "seculo", "century", "ano", "anos", "year", "years", "atacado", "varejo",
+    "bulk", "wholesale", "retail", "online", "internet", "forma", "form",
+}
+
+TRAILING_NOISE = re.compile(r"(?:\s*(?:please|por\s+favor))?\s*[?!.]*\s*$", re.IGNORECASE)
+
+# Longer "locations" are usually follow-up questions, better left to the agent
+MAX_LOCATION_WORDS = 6
+
+# Name stored on the router's templated replies, so they don't count as conversation history
+ROUTED_REPLY_NAME = "router"
+
+TEMPLATES = {
+    "greeting": {
+        "pt": (
+            "Olá! ☕ Sou o assistente de café brasileiro. Posso contar sobre a história do café "
+            "no Brasil, cultivo, colheita, torra, métodos de preparo, regiões produtoras e até "
+            "encontrar cafeterias na sua cidade. O que você gostaria de saber?"
+        ),
+        "en": (
+            "Hello! ☕ I'm the Brazilian coffee assistant. I can tell you about the history of "
+            "coffee in Brazil, growing, harvesting, roasting, brewing methods, producing regions, "
+            "and even find coffee shops in your city. What would you like to know?"
+        ),
+    },
+    "thanks": {
+        "pt": "De nada! ☕ Se quiser saber mais alguma coisa sobre café brasileiro, é só perguntar.",
+        "en": "You're welcome! ☕ If you want to know anything else about Brazilian coffee, just ask.",
+    },
+    "off_topic": {
+        "pt": (
+            "Sou especializado em café brasileiro! Não posso ajudar com {topic}, mas adoraria "
+            "falar sobre café. O que você gostaria de saber sobre o café brasileiro?"
+        ),
+        "en": (
+            "I'm specialized in Brazilian coffee! I can't help with {topic}, but I'd love to "
+            "tell you about coffee. What would you like to know about Brazilian coffee?"
+        ),
+    },
+    "places": {
+        "pt": "☕ Aqui estão algumas cafeterias em **{location}**:\n\n{results}",
+        "en": "☕ Here are some coffee shops in **{location}**:\n\n{results}",
+    },
+}
+
+
+@dataclass
+class Route:
+    """Routing decision for a user message."""
+
+    kind: str  # "greeting", "thanks", "off_topic", "places" or "agent"
+    language: str  # "pt" or "en"
+    topic: str | None = None
+    location: str | None = None
+
+
+def _normalize(text: str) -> str:
+    """Lowercase and strip accents so 'Café' and 'cafe' match."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def _tokenize(text: str) -> list[str]:
+    return re.findall(r"\w+", _normalize(text))
+
+
+def content_tokens(text: str) -> set[str]:
+    """Accent-insensitive tokens of a text, without Portuguese/English function words."""
+    return {
+        token
+        for token in _tokenize(text)
+        if token not in PORTUGUESE_MARKERS and token not in ENGLISH_MARKERS
+    }
+
+
+def is_coffee_question(message: str) -> bool:
+    """Whether a message uses coffee vocabulary (likely a knowledge-base question)."""
+    return bool(set(_tokenize(message)) & COFFEE_TERMS)
+
+
+def detect_language(message: str) -> str:
+    """
+    Guess whether a message is Portuguese or English.
+
+    Args:
+        message: User's message
+
+    Returns:
+        "pt" or "en" (ties go to Portuguese)
+    """
+    tokens = _tokenize(message)
+    portuguese = sum(token in PORTUGUESE_MARKERS for token in tokens)
+    english = sum(token in ENGLISH_MARKERS for token in tokens)
+    if re.search(r"[ãõçáéíóúâêô]", message.lower()):
+        portuguese += 1
+    return "en" if english > portuguese else "pt"
+
+
+def _match_small_talk(tokens: list[str]) -> str | None:
+    """Return the small-talk kind if the message is nothing but a greeting or thanks."""
+    if not tokens or len(tokens) > 6:
+        return None
+
+    text = " ".join(tokens)
+    for kind, phrases in GREETING_PHRASES.items():
+        # Greedily strip known phrases; if nothing is left the whole message was small talk
+        remaining = f" {text} "
+        for phrase in sorted(phrases, key=len, reverse=True):
+            remaining = remaining.replace(f" {phrase} ", " ")
+        if not remaining.strip():
+            return kind
+    return None
+
+
+def _match_off_topic(tokens: list[str]) -> str | None:
+    """Return the off-topic category if the message mentions one and nothing about coffee."""
+    token_set = set(tokens)
+    if token_set & COFFEE_TERMS:
+        return None
+
+    for category, entry in OFF_TOPIC_TERMS.items():
+        if token_set & entry["terms"]:
+            return category
+    return None
+
+
+def _match_places(message: str) -> str | None:
+    """Extract the location from a 'where to buy coffee in X' question."""
+    text = message.strip()
+    for pattern in PLACES_PATTERNS:
+        match = pattern.match(text)
+        if not match:
+            continue
+
+        location = TRAILING_NOISE.sub("", match.group("location")).strip(" ,")
+        if not location or len(location.split()) > MAX_LOCATION_WORDS:
+            continue
+        if set(_tokenize(location)) & (COFFEE_TERMS | NON_LOCATION_TERMS):
+            return None
+        return location
+    return None
+
+
+def route_message(message: str, has_history: Callable[[], bool] | None = None) -> Route:
+    """
+    Classify a message before it reaches the agent.
+
+    Only clear-cut cases are short-circuited: pure greetings/thanks, short
+    "where to buy coffee in X" questions and, on the first turn of a session,
+    questions that mention an off-topic subject without any coffee vocabulary.
+    Later turns are often follow-ups that rely on earlier context ("and the
+    president back then?"), so they go to the agent, which sees the history.
+    Everything else goes to the agent too.
+
+    Args:
+        message: User's message
+        has_history: Whether the session already has agent replies (the
+            router's own templated replies don't count); only called when
+            the message looks off-topic (None means a first turn)
+
+    Returns:
+        Routing decision
+    """
+    language = detect_language(message)
+    tokens = _tokenize(message)
+
+    small_talk = _match_small_talk(tokens)
+    if small_talk:
+        return Route(kind=small_talk, language=language)
+
+    if settings.GPLACES_API_KEY:
+        location = _match_places(message)
+        if location:
+            return Route(kind="places", language=language, location=location)
+
+    category = _match_off_topic(tokens)
+    if category and not (has_history is not None and has_history()):
+        return Route(kind="off_topic", language=language, topic=OFF_TOPIC_TERMS[category][language])
+
+    return Route(kind="agent", language=language)
+
+
+def render_template(route: Route, results: str | None = None) -> str:
+    """
+    Build the reply for a short-circuited route.
+
+    Args:
+        route: Routing decision (not "agent")
+        results: Formatted Places results for the "places" route
+
+    Returns:
+        Reply text in the user's language
+    """
+    return TEMPLATES[route.kind][route.language].format(
+        topic=route.topic,
+        location=route.location,
+        results=results,
+    )
+
+
+def router_report() -> dict:
+    """Summarize how many turns the router answered without the agent."""
+    routed = metrics.counter("router.short_circuited")
+    agent = metrics.counter("router.agent")
+    turns = routed + agent
+    routed_mean = metrics.mean("router.routed_turn")
+    agent_mean = metrics.mean("router.agent_turn")
+
+    latency_saved = None
+    if routed_mean is not None and agent_mean is not None:
+        latency_saved = round(routed * max(agent_mean - routed_mean, 0.0), 3)
+
+    return {
+        "turns": int(turns),
+        "short_circuited": int(routed),
+        "avoided_fraction": round(routed / turns, 4) if turns else 0.0,
+        "mean_routed_turn_seconds": routed_mean,
+        "mean_agent_turn_seconds": agent_mean,
+        "estimated_latency_saved_seconds": latency_saved,
+    }
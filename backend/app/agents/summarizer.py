@@ -0,0 +1,175 @@
+import asyncio
+import logging
+from functools import lru_cache
+from typing import TYPE_CHECKING
+from weakref import WeakValueDictionary
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+from app.db.history_cache import SessionWindow
+from app.db.session_manager import get_session_history, get_session_summary, save_session_summary
+from app.settings import settings
+
+if TYPE_CHECKING:
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and a Brazilian coffee assistant.
+
+Current summary (may be empty):
+{summary}
+
+New messages to fold into the summary:
+{messages}
+
+Write the updated summary in at most {max_words} words. Keep facts the user shared about
+themselves (location, taste, equipment), questions already answered and their key answers,
+and any open questions. Write it in the same language as the conversation. Reply with the
+summary only."""
+
+# Rough characters-per-token ratio for Gemini on Portuguese/English text
+CHARS_PER_TOKEN = 4
+
+# Keeps references to running updates so they aren't garbage collected
+_pending_updates: set[asyncio.Task] = set()
+_session_locks: WeakValueDictionary[str, asyncio.Lock] = WeakValueDictionary()
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate, good enough for budgeting prompt size."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def message_text(message: BaseMessage) -> str:
+    """Get the plain text of a message (Gemini may return a list of content blocks)."""
+    if isinstance(message.content, str):
+        return message.content
+
+    parts = []
+    for item in message.content:
+        if isinstance(item, dict) and "text" in item:
+            parts.append(item["text"])
+        elif isinstance(item, str):
+            parts.append(item)
+    return "".join(parts)
+
+
+def build_context(
+    chat_history: list[BaseMessage],
+    summary: tuple[str, int] | None,
+    offset: int = 0,
+) -> list[BaseMessage]:
+    """
+    Build the history sent to the agent for a new turn.
+
+    The running summary stands in for everything it covers; the messages after
+    it are added newest-first until the token budget runs out, capped at
+    HISTORY_RECENT_MESSAGES.
+
+    Args:
+        chat_history: Stored messages of the session, oldest first (all of
+            them, or a recent window)
+        summary: (summary, summarized_count) from get_session_summary, if any
+        offset: Position of chat_history[0] in the full history, when only a
+            recent window was loaded
+
+    Returns:
+        Messages to place before the user's new message
+    """
+    budget = settings.HISTORY_TOKEN_BUDGET
+    context: list[BaseMessage] = []
+    recent = chat_history
+
+    if summary:
+        summary_text, summarized_count = summary
+        context.append(SystemMessage(content=f"Summary of the earlier conversation:\n{summary_text}"))
+        budget -= estimate_tokens(summary_text)
+        recent = chat_history[max(summarized_count - offset, 0):]
+
+    window: list[BaseMessage] = []
+    for message in reversed(recent[-settings.HISTORY_RECENT_MESSAGES:]):
+        tokens = estimate_tokens(message_text(message))
+        if tokens > budget:
+            break
+        window.insert(0, message)
+        budget -= tokens
+
+    # A window starting with an assistant reply has lost its question; drop it
+    if window and not isinstance(window[0], HumanMessage):
+        window = window[1:]
+
+    return context + window
+
+
+@lru_cache(maxsize=1)
+def get_summary_llm() -> "ChatGoogleGenerativeAI":
+    """Get the (cheaper) Gemini model used for summaries."""
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI(
+        model=settings.SUMMARY_MODEL,
+        google_api_key=settings.GOOGLE_API_KEY,
+        temperature=0.2,
+        max_retries=2,
+    )
+
+
+async def update_summary(session_id: str) -> None:
+    """
+    Fold messages that have left the recent window into the session summary.
+
+    Only the messages after the summarized ones are read, and only those and
+    the previous summary are sent to the model, so each update costs the same
+    regardless of how long the session is.
+
+    Args:
+        session_id: Session ID for history management
+    """
+    stored = await asyncio.to_thread(get_session_summary, session_id)
+    summary, summarized_count = stored or ("", 0)
+    unsummarized = await asyncio.to_thread(_load_history_from, session_id, summarized_count)
+    fold_until = unsummarized.total - settings.HISTORY_RECENT_MESSAGES
+    if fold_until - summarized_count < settings.SUMMARY_MIN_NEW_MESSAGES:
+        return
+    to_fold = unsummarized.messages[: fold_until - summarized_count]
+
+    transcript = "\n".join(
+        f"{'User' if message.type == 'human' else 'Assistant'}: {message_text(message)}"
+        for message in to_fold
+    )
+    prompt = SUMMARY_PROMPT.format(
+        summary=summary or "(empty)",
+        messages=transcript,
+        max_words=settings.SUMMARY_MAX_WORDS,
+    )
+
+    response = await get_summary_llm().ainvoke(prompt)
+    new_summary = message_text(response).strip()
+    if new_summary:
+        await asyncio.to_thread(save_session_summary, session_id, new_summary, fold_until)
+
+
+def _load_history_from(session_id: str, start: int) -> SessionWindow:
+    with get_session_history(session_id) as history_manager:
+        return history_manager.read_from(start)
+
+
+async def _update_summary_safely(session_id: str) -> None:
+    # Serialize updates per session so two turns don't fold the same messages
+    lock = _session_locks.get(session_id)
+    if lock is None:
+        lock = _session_locks[session_id] = asyncio.Lock()
+
+    try:
+        async with lock:
+            await update_summary(session_id)
+    except Exception as e:
+        logger.warning(f"Failed to update summary for session {session_id}: {e}")
+
+
+def schedule_summary_update(session_id: str) -> None:
+    """Update the session summary in the background, after the response was sent."""
+    task = asyncio.create_task(_update_summary_safely(session_id))
+    _pending_updates.add(task)
+    task.add_done_callback(_pending_updates.discard)
@@ -0,0 +1,166 @@
+"""
+Batch chat runner for evaluation sets and bulk workloads.
+
+Items run through chat_simple with bounded concurrency under the batch share
+of the admission limits. Items of the same session run one after the other, in
+request order, so multi-turn conversations keep their history. Results are
+produced as they complete, one JSON object per item, followed by a summary.
+
+CLI (posts to a running server, so the server's admission limits apply):
+    python -m app.batch questions.jsonl > results.ndjson
+    python -m app.batch questions.jsonl --url http://localhost:8000 --concurrency 2 -o results.ndjson
+
+Each input line is {"message": "...", "session_id": "<uuid>", "id": "..."}.
+session_id is optional (a new session per item) and id is echoed back.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+from collections import defaultdict
+from typing import AsyncGenerator
+from uuid import UUID
+
+from pydantic import BaseModel, Field
+
+from app.admission import admission
+from app.agents.coffee_agent import TurnStats, chat_simple
+from app.metrics import metrics, percentile
+from app.settings import settings
+
+
+class BatchItem(BaseModel):
+    """One message of a batch."""
+
+    message: str
+    session_id: UUID = Field(default_factory=uuid.uuid4)
+    id: str | None = None  # Caller's label, echoed back in the result
+
+
+class BatchRequest(BaseModel):
+    """Batch chat request model."""
+
+    items: list[BatchItem] = Field(min_length=1, max_length=settings.BATCH_MAX_ITEMS)
+    concurrency: int | None = Field(default=None, ge=1)  # Capped at BATCH_MAX_CONCURRENCY
+
+
+async def _run_item(index: int, item: BatchItem) -> dict:
+    """Run one item under a batch admission slot and describe the outcome."""
+    result = {"type": "result", "index": index, "id": item.id, "session_id": str(item.session_id)}
+    stats = TurnStats()
+
+    async with admission.slot(batch=True):
+        start = time.perf_counter()
+        try:
+            response = await chat_simple(item.message, str(item.session_id), stats)
+            result.update(status="ok", response=response)
+        except Exception as e:
+            metrics.increment("batch.errors")
+            result.update(status="error", error=str(e))
+        latency = time.perf_counter() - start
+
+    metrics.increment("batch.items")
+    metrics.observe("batch.item", latency)
+    result.update(latency_ms=round(latency * 1000, 1), route=stats.route, tools=stats.tools)
+    return result
+
+
+async def run_batch(items: list[BatchItem], concurrency: int | None = None) -> AsyncGenerator[dict, None]:
+    """
+    Run a batch of chat messages.
+
+    Args:
+        items: Messages to send, in order
+        concurrency: Sessions processed at once (capped at BATCH_MAX_CONCURRENCY)
+
+    Yields:
+        One result per item as it completes, then a summary
+    """
+    start = time.perf_counter()
+    sessions: dict[UUID, list[tuple[int, BatchItem]]] = defaultdict(list)
+    for index, item in enumerate(items):
+        sessions[item.session_id].append((index, item))
+
+    pending: asyncio.Queue[list[tuple[int, BatchItem]]] = asyncio.Queue()
+    for session_items in sessions.values():
+        pending.put_nowait(session_items)
+    results: asyncio.Queue[dict] = asyncio.Queue()
+
+    async def worker():
+        while not pending.empty():
+            for index, item in pending.get_nowait():
+                await results.put(await _run_item(index, item))
+
+    workers_count = min(concurrency or settings.BATCH_MAX_CONCURRENCY, admission.batch_limit, len(sessions))
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, workers_count))]
+
+    latencies = []
+    errors = 0
+    try:
+        for _ in range(len(items)):
+            result = await results.get()
+            latencies.append(result["latency_ms"])
+            errors += result["status"] == "error"
+            yield result
+    finally:
+        # Stop remaining work if the caller went away
+        for task in workers:
+            task.cancel()
+
+    yield {
+        "type": "summary",
+        "items": len(items),
+        "ok": len(items) - errors,
+        "errors": errors,
+        "elapsed_seconds": round(time.perf_counter() - start, 3),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 1) if latencies else None,
+            "p99": round(percentile(latencies, 99), 1) if latencies else None,
+        },
+    }
+
+
+def main() -> None:
+    import httpx
+
+    parser = argparse.ArgumentParser(description="Send a JSONL file of messages to POST /chat/batch.")
+    parser.add_argument("input", help="JSONL file with one item per line ('-' for stdin)")
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of the running API")
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("-o", "--output", default=None, help="Write NDJSON results here instead of stdout")
+    args = parser.parse_args()
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    with source:
+        items = [json.loads(line) for line in source if line.strip()]
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    payload = {"items": items, "concurrency": args.concurrency}
+    with httpx.Client(base_url=args.url, timeout=None) as client:
+        with client.stream("POST", "/chat/batch", json=payload) as response:
+            if response.status_code != 200:
+                response.read()
+                sys.exit(f"Batch rejected ({response.status_code}): {response.text}")
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                output.write(line + "\n")
+                output.flush()
+                result = json.loads(line)
+                if result["type"] == "result":
+                    print(
+                        f"  [{result['index']}] {result['status']} {result['latency_ms']:.0f}ms "
+                        f"route={result['route']} tools={result['tools']}",
+                        file=sys.stderr,
+                    )
+                else:
+                    print(f"Summary: {json.dumps(result)}", file=sys.stderr)
+
+    if args.output:
+        output.close()
+
+
+if __name__ == "__main__":
+    main()
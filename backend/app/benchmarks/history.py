@@ -0,0 +1,140 @@
+"""
+Prompt-size benchmark for conversation history.
+
+Replays long synthetic sessions offline and compares the estimated tokens
+per turn of three policies:
+  - full:    the whole history is replayed every turn
+  - last4:   the previous fixed chat_history[-4:] window
+  - summary: running summary + recent window under HISTORY_TOKEN_BUDGET,
+             plus the summarizer call (its prompt and the summary it writes)
+             on every turn that triggers an update
+
+Usage:
+    python -m app.benchmarks.history
+    python -m app.benchmarks.history --turns 100 --sessions 20
+"""
+import argparse
+import random
+import statistics
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from app.agents.coffee_agent import SYSTEM_PROMPT
+from app.agents.summarizer import SUMMARY_PROMPT, build_context, estimate_tokens, message_text
+from app.settings import settings
+
+WORDS = (
+    "café arábica robusta torra colheita safra cerrado mogiana sul de minas especial "
+    "grão moagem coado espresso fazenda lavoura secagem terreiro despolpado natural "
+    "acidez corpo doçura aroma barista xícara pontuação classificação peneira"
+).split()
+
+
+def _sentence(rng: random.Random, length: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+
+def synthetic_session(turns: int, seed: int) -> list[tuple[str, str]]:
+    """Generate (question, answer) pairs of realistic length."""
+    rng = random.Random(seed)
+    return [
+        (_sentence(rng, rng.randint(8, 30)), _sentence(rng, rng.randint(120, 320)))
+        for _ in range(turns)
+    ]
+
+
+def _tokens(messages: list[BaseMessage]) -> int:
+    return sum(estimate_tokens(message_text(message)) for message in messages)
+
+
+def _summarizer_tokens(summary: str, to_fold: list[BaseMessage], new_summary: str) -> int:
+    """Input and output tokens of one summarizer call, with the prompt update_summary sends."""
+    transcript = "\n".join(
+        f"{'User' if message.type == 'human' else 'Assistant'}: {message_text(message)}"
+        for message in to_fold
+    )
+    prompt = SUMMARY_PROMPT.format(
+        summary=summary or "(empty)",
+        messages=transcript,
+        max_words=settings.SUMMARY_MAX_WORDS,
+    )
+    return estimate_tokens(prompt) + estimate_tokens(new_summary)
+
+
+def replay(session: list[tuple[str, str]], policy: str) -> tuple[list[int], list[int]]:
+    """
+    Estimate tokens for every turn of a session under one policy.
+
+    The summary policy assumes the background update finished before the
+    next turn, and that summaries use their full SUMMARY_MAX_WORDS.
+
+    Returns:
+        (agent input tokens, summarizer input + output tokens) per turn
+    """
+    rng = random.Random(0)
+    base = estimate_tokens(SYSTEM_PROMPT)
+    history: list[BaseMessage] = []
+    summary: tuple[str, int] | None = None
+    agent_tokens, summarizer_tokens = [], []
+
+    for question, answer in session:
+        if policy == "full":
+            context = history
+        elif policy == "last4":
+            context = history[-4:] if len(history) >= 2 else []
+        else:
+            context = build_context(history, summary)
+
+        agent_tokens.append(base + _tokens(context) + estimate_tokens(question))
+        history += [HumanMessage(content=question), AIMessage(content=answer)]
+
+        fold_until = len(history) - settings.HISTORY_RECENT_MESSAGES
+        summary_text, summarized_count = summary or ("", 0)
+        spent = 0
+        if policy == "summary" and fold_until - summarized_count >= settings.SUMMARY_MIN_NEW_MESSAGES:
+            new_summary = _sentence(rng, settings.SUMMARY_MAX_WORDS)
+            spent = _summarizer_tokens(summary_text, history[summarized_count:fold_until], new_summary)
+            summary = (new_summary, fold_until)
+        summarizer_tokens.append(spent)
+
+    return agent_tokens, summarizer_tokens
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare prompt size of history policies")
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--sessions", type=int, default=10)
+    args = parser.parse_args()
+
+    sessions = [synthetic_session(args.turns, seed) for seed in range(args.sessions)]
+    results = {
+        policy: [replay(session, policy) for session in sessions]
+        for policy in ("full", "last4", "summary")
+    }
+
+    print(f"\n{'='*72}")
+    print(f"History Benchmark ({args.sessions} sessions x {args.turns} turns)")
+    print(f"{'='*72}")
+    print(f"  {'policy':<10}{'mean/turn':>12}{'last turn':>12}{'summarizer':>14}{'total':>14}")
+    for policy, runs in results.items():
+        per_turn = [
+            agent + summarizer
+            for agent_run, summarizer_run in runs
+            for agent, summarizer in zip(agent_run, summarizer_run)
+        ]
+        last_turn = statistics.mean(agent_run[-1] + summarizer_run[-1] for agent_run, summarizer_run in runs)
+        summarizer_total = statistics.mean(sum(summarizer_run) for _, summarizer_run in runs)
+        total = statistics.mean(sum(agent_run) + sum(summarizer_run) for agent_run, summarizer_run in runs)
+        print(
+            f"  {policy:<10}{statistics.mean(per_turn):>12.0f}{last_turn:>12.0f}"
+            f"{summarizer_total:>14.0f}{total:>14.0f}"
+        )
+
+    def grand_total(policy: str) -> int:
+        return sum(sum(agent_run) + sum(summarizer_run) for agent_run, summarizer_run in results[policy])
+
+    print(
+        f"\n  summary vs full replay: {grand_total('summary') / grand_total('full'):.1%} of the tokens "
+        f"(agent input plus summarizer input and output)"
+    )
+    print(f"{'='*72}")
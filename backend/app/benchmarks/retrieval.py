@@ -0,0 +1,451 @@
+"""
+Retrieval quality and latency benchmark.
+
+Indexes the PDFs in backend/pdfs once per chunk size and overlap, and
+searches a labelled question set against each index at every k configured
+for it:
+  - recall@k: fraction of questions whose evidence passage is in a retrieved chunk
+  - MRR:      mean of 1/rank of the first such chunk (0 when it wasn't retrieved)
+  - latency:  p50/p99 of one retrieval (query embedding + search)
+  - tokens:   estimated tokens search_coffee_knowledge returns per query
+
+Questions come from questions.jsonl next to this module (or --questions), a
+hand-written set with "question", "source" (PDF file name) and "evidence" (a
+passage copied verbatim from that PDF). The questions are paraphrased, mostly
+in Portuguese with a few in English, so they share few words with the text.
+
+With --generate (or when the file is missing) questions are generated from
+the corpus with a fixed seed instead: a sentence is sampled and a subset of
+its content words becomes the query. Generated questions are lexical probes,
+not real user questions, and score higher than the curated set.
+
+Embedders: "hash" (deterministic feature hashing, offline) or "gemini"
+(gemini-embedding-001, one API call per chunk batch and per query).
+Backends: "memory" or "pgvector" (a temporary collection in DATABASE_URL).
+
+The parsed corpus is cached under .ingestion/ (reusing sources from
+ingestion runs when available) so repeated runs don't parse the PDFs again.
+
+Usage:
+    python -m app.benchmarks.retrieval
+    python -m app.benchmarks.retrieval --config chunk=1000,overlap=200,k=5 --config chunk=500,overlap=100,k=8
+    python -m app.benchmarks.retrieval --embedder gemini --backend pgvector
+    python -m app.benchmarks.retrieval --generate --count 500
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import statistics
+import time
+from collections import Counter, defaultdict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, List
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from app.agents.router import content_tokens
+from app.agents.summarizer import estimate_tokens
+from app.ingestion.checkpoint import read_documents, write_documents
+from app.ingestion.embedder import chunk_documents
+from app.metrics import percentile
+from app.settings import settings
+from app.tools.rag_tool import KNOWLEDGE_TOP_K, format_documents
+
+if TYPE_CHECKING:
+    from langchain_core.vectorstores import VectorStore
+
+PDF_DIR = Path(__file__).resolve().parents[2] / "pdfs"
+QUESTIONS_PATH = Path(__file__).with_name("questions.jsonl")
+CORPUS_CACHE = Path(settings.INGESTION_RUNS_DIR).parent / "benchmark_corpus.jsonl.gz"
+
+DEFAULT_CONFIGS = [
+    f"chunk=1000,overlap=200,k={KNOWLEDGE_TOP_K}",
+    f"chunk=500,overlap=100,k={KNOWLEDGE_TOP_K}",
+    "chunk=1000,overlap=200,k=10",
+]
+
+SENTENCE = re.compile(r"[^.!?]+[.!?]")
+
+
+@dataclass
+class Question:
+    """A query and where its answer is in the corpus."""
+
+    question: str
+    source: str
+    evidence: str
+    doc_index: int  # Position of the corpus document holding the evidence
+    start: int  # Character span of the evidence within that document
+    end: int
+
+
+@dataclass
+class BenchConfig:
+    """One retrieval configuration to compare."""
+
+    chunk_size: int = 1000
+    chunk_overlap: int = 200
+    k: int = KNOWLEDGE_TOP_K
+
+    @classmethod
+    def parse(cls, spec: str) -> "BenchConfig":
+        """Parse 'chunk=1000,overlap=200,k=5' (missing keys keep their defaults)."""
+        names = {"chunk": "chunk_size", "overlap": "chunk_overlap", "k": "k"}
+        values = {}
+        for part in spec.split(","):
+            key, _, value = part.partition("=")
+            if key.strip() not in names:
+                raise ValueError(f"Unknown config key '{key}' (expected chunk, overlap or k)")
+            values[names[key.strip()]] = int(value)
+        return cls(**values)
+
+    @property
+    def label(self) -> str:
+        return f"chunk={self.chunk_size},overlap={self.chunk_overlap},k={self.k}"
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic bag-of-words embeddings (signed feature hashing).
+
+    Needs no network or model, so results are reproducible anywhere. It only
+    matches shared words: synonyms and translations score as unrelated.
+    """
+
+    def __init__(self, dimension: int = 1024):
+        self.dimension = dimension
+
+    def _embed(self, text: str) -> list[float]:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in content_tokens(text):
+            digest = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+            vector[digest % self.dimension] += 1.0 if digest >> 63 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed(text)
+
+
+def get_benchmark_embeddings(name: str) -> Embeddings:
+    """Get the embedder named on the command line."""
+    if name == "hash":
+        return HashingEmbeddings()
+    if name == "gemini":
+        from app.db.vector_store import get_embeddings
+
+        return get_embeddings()
+    raise ValueError(f"Unknown embedder '{name}'")
+
+
+def load_corpus(pdf_dir: Path = PDF_DIR, refresh: bool = False) -> List[Document]:
+    """
+    Load the parsed PDFs, in file name order.
+
+    Uses the benchmark's corpus cache, else the parsed sources of the latest
+    ingestion run that has them, else parses the PDF.
+
+    Args:
+        pdf_dir: Directory with the PDFs
+        refresh: Ignore the corpus cache
+
+    Returns:
+        Documents as produced by load_pdf
+    """
+    if CORPUS_CACHE.exists() and not refresh:
+        documents, _ = read_documents(CORPUS_CACHE)
+        return documents
+
+    from app.ingestion.pdf_loader import load_pdf
+
+    documents: List[Document] = []
+    runs_dir = Path(settings.INGESTION_RUNS_DIR)
+    for pdf_file in sorted(pdf_dir.glob("*.pdf")):
+        parsed = sorted(runs_dir.glob(f"*/sources/{pdf_file.name}.jsonl.gz"), reverse=True)
+        if parsed:
+            print(f"Reusing: {pdf_file.name} ({parsed[0].parent.parent.name})")
+            documents.extend(read_documents(parsed[0])[0])
+        else:
+            print(f"Processing: {pdf_file.name}")
+            documents.extend(load_pdf(str(pdf_file)))
+
+    CORPUS_CACHE.parent.mkdir(parents=True, exist_ok=True)
+    write_documents(CORPUS_CACHE, documents)
+    return documents
+
+
+def generate_questions(corpus: List[Document], count: int, seed: int) -> list[Question]:
+    """
+    Sample evidence sentences evenly across sources and turn each into a query.
+
+    Sentences of 12-40 words that are mostly letters (no tables or page
+    furniture) and appear only once in the corpus are candidates. The query
+    keeps about 60% of a sentence's content words, in order.
+    """
+    rng = random.Random(seed)
+    sentences = []
+    for doc_index, doc in enumerate(corpus):
+        for match in SENTENCE.finditer(doc.page_content):
+            text = match.group().strip()
+            words = text.split()
+            letters = sum(char.isalpha() for char in text)
+            if 12 <= len(words) <= 40 and letters >= 0.75 * len(text.replace(" ", "")):
+                start = match.start() + match.group().index(text)
+                sentences.append((doc_index, start, text))
+
+    occurrences = Counter(text for _, _, text in sentences)
+    by_source: dict[str, list] = defaultdict(list)
+    for doc_index, start, text in sentences:
+        if occurrences[text] == 1:
+            by_source[corpus[doc_index].metadata.get("source", "unknown")].append((doc_index, start, text))
+
+    for candidates in by_source.values():
+        rng.shuffle(candidates)
+
+    questions = []
+    while len(questions) < count and any(by_source.values()):
+        for source in sorted(by_source):
+            if not by_source[source] or len(questions) == count:
+                continue
+            doc_index, start, text = by_source[source].pop()
+            keywords = [word for word in text.split() if content_tokens(word)]
+            kept = [word for word in keywords if rng.random() < 0.6] or keywords
+            query = " ".join(kept if len(kept) >= 4 else keywords).strip(".!?,;:")
+            questions.append(Question(query, source, text, doc_index, start, start + len(text)))
+
+    return questions
+
+
+def load_questions(path: str | Path, corpus: List[Document]) -> list[Question]:
+    """
+    Load a curated question set, locating each evidence passage in the corpus.
+
+    Evidence is matched word for word, ignoring how whitespace and line breaks
+    fall in the extracted text.
+    """
+    questions = []
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            pattern = re.compile(r"\s+".join(re.escape(word) for word in record["evidence"].split()))
+            for doc_index, doc in enumerate(corpus):
+                if doc.metadata.get("source") != record["source"]:
+                    continue
+                match = pattern.search(doc.page_content)
+                if match:
+                    questions.append(
+                        Question(
+                            record["question"],
+                            record["source"],
+                            record["evidence"],
+                            doc_index,
+                            match.start(),
+                            match.end(),
+                        )
+                    )
+                    break
+            else:
+                print(f"  ✗ Evidence not found in {record['source']}, skipping: {record['question']}")
+    return questions
+
+
+def build_chunks(corpus: List[Document], config: BenchConfig) -> List[Document]:
+    """Chunk the corpus, recording each chunk's document and character span."""
+    chunks = []
+    for doc_index, doc in enumerate(corpus):
+        cursor = 0
+        for chunk in chunk_documents([doc], config.chunk_size, config.chunk_overlap):
+            start = doc.page_content.find(chunk.page_content, cursor)
+            if start < 0:
+                start = doc.page_content.find(chunk.page_content)
+            cursor = max(start, 0) + 1
+            chunk.metadata.update(doc_index=doc_index, start=start, end=start + len(chunk.page_content))
+            chunks.append(chunk)
+    return chunks
+
+
+def build_store(backend: str, embeddings: Embeddings, chunks: List[Document], name: str) -> "VectorStore":
+    """Index the chunks in a fresh store."""
+    if backend == "memory":
+        from langchain_core.vectorstores import InMemoryVectorStore
+
+        store = InMemoryVectorStore(embedding=embeddings)
+    elif backend == "pgvector":
+        from langchain_postgres import PGVector
+
+        store = PGVector(
+            embeddings=embeddings,
+            collection_name=name,
+            connection=settings.DATABASE_URL.replace("postgresql://", "postgresql+psycopg://"),
+            use_jsonb=True,
+            pre_delete_collection=True,
+        )
+    else:
+        raise ValueError(f"Unknown backend '{backend}'")
+
+    for i in range(0, len(chunks), 100):
+        store.add_documents(chunks[i : i + 100])
+    return store
+
+
+def _is_relevant(chunk: Document, question: Question) -> bool:
+    """Whether a chunk holds at least half of the evidence (or is half evidence itself)."""
+    if chunk.metadata.get("doc_index") != question.doc_index:
+        return False
+    start, end = chunk.metadata["start"], chunk.metadata["end"]
+    overlap = min(end, question.end) - max(start, question.start)
+    return overlap >= 0.5 * min(question.end - question.start, end - start)
+
+
+def evaluate(store: "VectorStore", embeddings: Embeddings, questions: list[Question], k: int) -> dict:
+    """
+    Search every question and score the results.
+
+    Returns:
+        recall@k, MRR, latency percentiles (ms) and mean tokens per query
+    """
+    hits, reciprocal_ranks, latencies, search_latencies, tokens = 0, [], [], [], []
+    for question in questions:
+        start = time.perf_counter()
+        vector = embeddings.embed_query(question.question)
+        search_start = time.perf_counter()
+        docs = store.similarity_search_by_vector(vector, k=k)
+        end = time.perf_counter()
+
+        latencies.append((end - start) * 1000)
+        search_latencies.append((end - search_start) * 1000)
+        tokens.append(estimate_tokens(format_documents(docs)))
+
+        rank = next((i for i, doc in enumerate(docs, 1) if _is_relevant(doc, question)), None)
+        hits += rank is not None
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+
+    return {
+        "recall_at_k": round(hits / len(questions), 4),
+        "mrr": round(statistics.mean(reciprocal_ranks), 4),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 2),
+            "p99": round(percentile(latencies, 99), 2),
+        },
+        "search_latency_ms": {
+            "p50": round(percentile(search_latencies, 50), 2),
+            "p99": round(percentile(search_latencies, 99), 2),
+        },
+        "tokens_per_query": round(statistics.mean(tokens), 1),
+    }
+
+
+def run_index(
+    configs: list[BenchConfig],
+    corpus: List[Document],
+    questions: list[Question],
+    embeddings: Embeddings,
+    backend: str,
+) -> list[dict]:
+    """
+    Index the corpus once and evaluate every configuration against it.
+
+    The configurations must share chunk size and overlap; only k differs,
+    so the chunks are embedded once however many k values are compared.
+    """
+    chunks = build_chunks(corpus, configs[0])
+    name = f"bench_c{configs[0].chunk_size}_o{configs[0].chunk_overlap}"
+
+    start = time.perf_counter()
+    store = build_store(backend, embeddings, chunks, name)
+    index_seconds = time.perf_counter() - start
+
+    results = []
+    try:
+        for config in configs:
+            print(f"Running {config.label} ...")
+            results.append(
+                {
+                    "config": asdict(config),
+                    "chunks": len(chunks),
+                    "index_seconds": round(index_seconds, 3),
+                    **evaluate(store, embeddings, questions, config.k),
+                }
+            )
+    finally:
+        if backend == "pgvector":
+            store.delete_collection()
+    return results
+
+
+def print_report(results: list[dict], questions: int, embedder: str, backend: str) -> None:
+    print(f"\n{'='*100}")
+    print(f"Retrieval Benchmark ({questions} questions, embedder={embedder}, backend={backend})")
+    print(f"{'='*100}")
+    print(
+        f"  {'config':<32}{'chunks':>8}{'recall@k':>10}{'MRR':>8}"
+        f"{'p50 ms':>9}{'p99 ms':>9}{'search p99':>12}{'tokens/q':>10}{'index s':>10}"
+    )
+    for result in results:
+        label = BenchConfig(**result["config"]).label
+        print(
+            f"  {label:<32}{result['chunks']:>8}{result['recall_at_k']:>10.3f}{result['mrr']:>8.3f}"
+            f"{result['latency_ms']['p50']:>9.1f}{result['latency_ms']['p99']:>9.1f}"
+            f"{result['search_latency_ms']['p99']:>12.2f}{result['tokens_per_query']:>10.0f}"
+            f"{result['index_seconds']:>10.1f}"
+        )
+    print(f"{'='*100}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare retrieval configurations on the bundled corpus")
+    parser.add_argument("--config", action="append", help="e.g. chunk=1000,overlap=200,k=5 (repeatable)")
+    parser.add_argument("--embedder", choices=["hash", "gemini"], default="hash")
+    parser.add_argument("--backend", choices=["memory", "pgvector"], default="memory")
+    parser.add_argument("--questions", default=str(QUESTIONS_PATH), help="Curated JSONL question set")
+    parser.add_argument("--generate", action="store_true", help="Generate questions from the corpus instead")
+    parser.add_argument("--count", type=int, default=200, help="Generated questions")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save-questions", help="Write the question set used to this JSONL file")
+    parser.add_argument("--refresh-corpus", action="store_true", help="Re-read the PDFs")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    configs = [BenchConfig.parse(spec) for spec in args.config or DEFAULT_CONFIGS]
+    corpus = load_corpus(refresh=args.refresh_corpus)
+    if args.generate or not Path(args.questions).exists():
+        questions = generate_questions(corpus, args.count, args.seed)
+    else:
+        questions = load_questions(args.questions, corpus)
+    if not questions:
+        raise SystemExit("No questions to evaluate")
+
+    if args.save_questions:
+        with open(args.save_questions, "w", encoding="utf-8") as file:
+            for question in questions:
+                record = {"question": question.question, "source": question.source, "evidence": question.evidence}
+                file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    embeddings = get_benchmark_embeddings(args.embedder)
+    by_index: dict[tuple[int, int], list[BenchConfig]] = defaultdict(list)
+    for config in configs:
+        by_index[(config.chunk_size, config.chunk_overlap)].append(config)
+
+    results = []
+    for index_configs in by_index.values():
+        results.extend(run_index(index_configs, corpus, questions, embeddings, args.backend))
+
+    print_report(results, len(questions), args.embedder, args.backend)
+    if args.json:
+        Path(args.json).write_text(
+            json.dumps(
+                {"embedder": args.embedder, "backend": args.backend, "questions": len(questions), "results": results},
+                indent=2,
+            ),
+            encoding="utf-8",
+        )
@@ -0,0 +1,133 @@
+"""
+Startup-time benchmark.
+
+Measures how long `import app.main` takes in a fresh interpreter and how long
+a freshly started server takes to answer its first successful requests.
+
+Usage:
+    python -m app.benchmarks.startup
+    python -m app.benchmarks.startup --runs 10 --chat-message "Como o café chegou ao Brasil?"
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..", "..")
+
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import app.main; "
+    "print(time.perf_counter() - start)"
+)
+
+
+def measure_import_time(runs: int) -> list[float]:
+    """
+    Import app.main in fresh interpreters.
+
+    Args:
+        runs: Number of interpreters to start
+
+    Returns:
+        Import time of each run, in seconds
+    """
+    timings = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return timings
+
+
+def _wait_for(client: httpx.Client, method: str, path: str, deadline: float, **kwargs) -> float | None:
+    """Poll an endpoint until it answers 200. Returns the monotonic time it did, or None."""
+    while time.monotonic() < deadline:
+        try:
+            response = client.request(method, path, **kwargs)
+            if response.status_code == 200:
+                return time.monotonic()
+        except httpx.TransportError:
+            pass
+        time.sleep(0.05)
+    return None
+
+
+def measure_first_requests(port: int, timeout: float, chat_message: str | None) -> dict[str, float | None]:
+    """
+    Start a server and time its first successful requests.
+
+    Args:
+        port: Port to bind the server to
+        timeout: Seconds to wait for each milestone
+        chat_message: If set, also time the first successful POST /chat
+
+    Returns:
+        Seconds from process start to each milestone (None if not reached)
+    """
+    start = time.monotonic()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)],
+        cwd=BACKEND_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    milestones: dict[str, float | None] = {"healthy": None, "ready": None, "first_chat": None}
+
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=timeout) as client:
+            healthy_at = _wait_for(client, "GET", "/", start + timeout)
+            ready_at = _wait_for(client, "GET", "/ready", start + timeout)
+            milestones["healthy"] = healthy_at and healthy_at - start
+            milestones["ready"] = ready_at and ready_at - start
+
+            if chat_message and ready_at:
+                chat_at = _wait_for(
+                    client,
+                    "POST",
+                    "/chat",
+                    time.monotonic() + timeout,
+                    json={"message": chat_message, "session_id": str(uuid.uuid4())},
+                )
+                milestones["first_chat"] = chat_at and chat_at - start
+    finally:
+        server.terminate()
+        server.wait()
+
+    return milestones
+
+
+def _format_seconds(value: float | None) -> str:
+    return f"{value:.3f}s" if value is not None else "not reached"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark backend startup time")
+    parser.add_argument("--runs", type=int, default=5, help="Import-time runs")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--chat-message", default=None, help="Also time the first POST /chat")
+    args = parser.parse_args()
+
+    import_times = measure_import_time(args.runs)
+    milestones = measure_first_requests(args.port, args.timeout, args.chat_message)
+
+    print(f"\n{'='*60}")
+    print("Startup Benchmark")
+    print(f"{'='*60}")
+    print(f"  import app.main (min):    {min(import_times):.3f}s")
+    print(f"  import app.main (median): {statistics.median(import_times):.3f}s")
+    print(f"  first 200 on /:           {_format_seconds(milestones['healthy'])}")
+    print(f"  first 200 on /ready:      {_format_seconds(milestones['ready'])}")
+    if args.chat_message:
+        print(f"  first 200 on /chat:       {_format_seconds(milestones['first_chat'])}")
+    print(f"{'='*60}")
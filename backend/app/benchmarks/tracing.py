@@ -0,0 +1,147 @@
+"""
+Tracing overhead benchmark.
+
+Runs agent turns offline (a LangGraph ReAct agent with a scripted model that
+calls one tool, then answers) with the same instrumentation chat() uses, and
+compares per-turn time with tracing disabled, with the default sampling and
+with every trace exported to a JSONL file.
+
+The scripted model answers instantly, so the overhead shown is relative to
+LangGraph's own per-turn cost; a real turn spends seconds in Gemini.
+
+Usage:
+    python -m app.benchmarks.tracing
+    python -m app.benchmarks.tracing --turns 2000 --model-latency-ms 5
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+
+from app.metrics import percentile
+from app.settings import settings
+from app.tracing import BatchExporter, JsonlSink, Tracer
+
+
+@tool
+def lookup_coffee_fact(query: str) -> str:
+    """Look up a coffee fact."""
+    return "O café chegou ao Brasil em 1727, trazido por Francisco de Melo Palheta."
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Calls lookup_coffee_fact once, then answers."""
+
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        usage = {"input_tokens": 800, "output_tokens": 60, "total_tokens": 860}
+        if isinstance(messages[-1], ToolMessage):
+            message = AIMessage(content="O café chegou ao Brasil em 1727.", usage_metadata=usage)
+        else:
+            tool_call = {"name": "lookup_coffee_fact", "args": {"query": "café no Brasil"}, "id": "call-1"}
+            message = AIMessage(content="", tool_calls=[tool_call], usage_metadata=usage)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+async def run_turn(agent, tracer: Tracer) -> float:
+    """One turn instrumented like chat(). Returns its duration in seconds."""
+    start = time.perf_counter()
+    trace = tracer.start_trace("chat", session_id="benchmark")
+    try:
+        with trace.span("router") as span:
+            span.set(route="agent")
+        trace.set(route="agent")
+        with trace.span("history.load"):
+            messages = [HumanMessage(content="Quando o café chegou ao Brasil?")]
+
+        agent_span = trace.start_span("agent")
+        async for _ in agent.astream(
+            {"messages": messages},
+            config={"callbacks": trace.callbacks(agent_span)},
+            stream_mode="messages",
+        ):
+            pass
+        agent_span.end()
+
+        with trace.span("history.save"):
+            pass
+    finally:
+        tracer.end_trace(trace)
+    return time.perf_counter() - start
+
+
+async def measure(agent, tracers: dict[str, Tracer], turns: int) -> dict[str, list[float]]:
+    """Run turns round-robin across the tracers, so drift affects every mode alike."""
+    for tracer in tracers.values():
+        for _ in range(min(50, turns)):
+            await run_turn(agent, tracer)
+
+    timings: dict[str, list[float]] = {label: [] for label in tracers}
+    for _ in range(turns):
+        for label, tracer in tracers.items():
+            timings[label].append(await run_turn(agent, tracer))
+    return timings
+
+
+if __name__ == "__main__":
+    from langgraph.prebuilt import create_react_agent
+
+    parser = argparse.ArgumentParser(description="Measure tracing overhead per chat turn")
+    parser.add_argument("--turns", type=int, default=1000)
+    parser.add_argument("--model-latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    agent = create_react_agent(
+        model=ScriptedChatModel(latency=args.model_latency_ms / 1000),
+        tools=[lookup_coffee_fact],
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sink = JsonlSink(str(Path(tmp) / "traces.jsonl"))
+
+        def make_tracer(enabled: bool, sample_rate: float) -> Tracer:
+            exporter = BatchExporter([sink], batch_size=50, interval=1.0, max_queue=settings.TRACE_QUEUE_SIZE)
+            return Tracer(enabled, sample_rate, settings.TRACE_SLOW_SECONDS, exporter)
+
+        modes = {
+            "disabled": make_tracer(False, 0.0),
+            f"sampled ({settings.TRACE_SAMPLE_RATE:.0%})": make_tracer(True, settings.TRACE_SAMPLE_RATE),
+            "all exported": make_tracer(True, 1.0),
+        }
+        results = asyncio.run(measure(agent, modes, args.turns))
+        for tracer in modes.values():
+            tracer.exporter.shutdown()
+
+        exported = sum(1 for _ in sink.path.open(encoding="utf-8")) if sink.path.exists() else 0
+
+    baseline = statistics.mean(results["disabled"])
+    print(f"\n{'='*70}")
+    print(f"Tracing Overhead ({args.turns} turns, model latency {args.model_latency_ms:.0f}ms)")
+    print(f"{'='*70}")
+    print(f"  {'mode':<20}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'overhead':>16}")
+    for label, timings in results.items():
+        mean = statistics.mean(timings)
+        overhead = f"{(mean - baseline) * 1e6:+.0f}us ({(mean - baseline) / baseline:+.1%})"
+        print(
+            f"  {label:<20}{mean * 1000:>10.3f}{percentile(timings, 50) * 1000:>10.3f}"
+            f"{percentile(timings, 99) * 1000:>10.3f}{overhead:>16}"
+        )
+    print(f"\n  traces written to JSONL: {exported}")
+    print(f"{'='*70}")
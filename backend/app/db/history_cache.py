@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from langchain_core.messages import BaseMessage
+
+from app.metrics import metrics
+from app.settings import settings
+
+
+@dataclass
+class SessionWindow:
+    """The most recent messages of a session, and how many the session has in total."""
+
+    total: int
+    messages: list[BaseMessage]
+    loaded_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def offset(self) -> int:
+        """Position of messages[0] in the full history."""
+        return self.total - len(self.messages)
+
+
+class HistoryCache:
+    """
+    Per-worker LRU of recent session windows.
+
+    Filled on reads, kept current by writes that go through this worker
+    (write-through) and invalidated when a session is cleared. Writes made by
+    other workers are not seen until the entry expires after `ttl` seconds,
+    so it is only correct when every turn of a session reaches the same
+    worker (sticky sessions). Disabled when max_sessions is 0.
+    """
+
+    def __init__(self, max_sessions: int, window: int, ttl: float):
+        self.max_sessions = max_sessions
+        self.window = window
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, SessionWindow] = OrderedDict()
+
+    def get(self, session_id: str) -> SessionWindow | None:
+        if self.max_sessions <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None and time.monotonic() - entry.loaded_at > self.ttl:
+                del self._entries[session_id]
+                entry = None
+            if entry is None:
+                metrics.increment("history_cache.miss")
+                return None
+            self._entries.move_to_end(session_id)
+        metrics.increment("history_cache.hit")
+        return SessionWindow(entry.total, list(entry.messages), entry.loaded_at)
+
+    def put(self, session_id: str, window: SessionWindow) -> None:
+        if self.max_sessions <= 0:
+            return
+        with self._lock:
+            self._entries[session_id] = SessionWindow(window.total, window.messages[-self.window :])
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_sessions:
+                self._entries.popitem(last=False)
+
+    def append(self, session_id: str, messages: list[BaseMessage]) -> None:
+        """Add messages just written to the database to a cached window."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return
+            entry.messages = (entry.messages + list(messages))[-self.window :]
+            entry.total += len(messages)
+
+    def invalidate(self, session_id: str) -> None:
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            sessions = len(self._entries)
+        hits, misses = metrics.counter("history_cache.hit"), metrics.counter("history_cache.miss")
+        return {
+            "sessions": sessions,
+            "max_sessions": self.max_sessions,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        }
+
+
+history_cache = HistoryCache(
+    settings.HISTORY_CACHE_SESSIONS,
+    max(settings.HISTORY_CACHE_MESSAGES, settings.HISTORY_RECENT_MESSAGES),
+    settings.HISTORY_CACHE_TTL,
+)
@@ -0,0 +1,254 @@
+"""
+Chat history maintenance.
+
+chat_history is partitioned by month on created_at. Maintenance creates the
+next HISTORY_PARTITIONS_AHEAD months in advance and, with
+HISTORY_RETENTION_DAYS set, drops months that ended before the retention
+window. Running summaries are adjusted so they keep pointing at the right
+messages. The API runs it every HISTORY_MAINTENANCE_HOURS; on hosts without
+long-lived workers, run it from a scheduler instead.
+
+Databases created before partitioning have a flat chat_history table;
+`migrate` moves its rows (in the compact message format) into the
+partitioned layout.
+
+Usage:
+    python -m app.db.retention run [--dry-run]
+    python -m app.db.retention migrate [--drop-legacy]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import re
+import time
+from datetime import date, datetime, timedelta
+
+from psycopg import sql
+
+from app.db.history_cache import history_cache
+from app.db.session_manager import (
+    CHAT_HISTORY_SQL,
+    decode_messages,
+    encode_message,
+    ensure_history_partitions,
+    get_connection_pool,
+    is_history_partitioned,
+)
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+BOUND_PATTERN = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+MIGRATION_BATCH_SIZE = 1000
+
+
+def list_partitions(conn) -> list[tuple[str, date, date]]:
+    """
+    List chat_history partitions.
+
+    Returns:
+        (name, first day, first day after) per partition, oldest first
+    """
+    rows = conn.execute(
+        """
+        SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = 'chat_history'::regclass
+        """
+    ).fetchall()
+
+    partitions = []
+    for name, bound in rows:
+        match = BOUND_PATTERN.search(bound)
+        if match:
+            start, end = (datetime.fromisoformat(value).date() for value in match.groups())
+            partitions.append((name, start, end))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def drop_expired_partitions(conn, retention_days: int, dry_run: bool = False) -> list[str]:
+    """
+    Drop partitions whose whole month is older than the retention window.
+
+    Summaries count the messages they cover from the start of the session,
+    so each session's summarized_count is reduced by its dropped messages,
+    and summaries of sessions with no messages left are deleted.
+
+    Returns:
+        Names of the dropped partitions
+    """
+    cutoff = conn.execute("SELECT CURRENT_DATE").fetchone()[0] - timedelta(days=retention_days)
+    expired = [name for name, _, end in list_partitions(conn) if end <= cutoff]
+    if dry_run:
+        return expired
+
+    for name in expired:
+        conn.execute(
+            sql.SQL(
+                """
+                UPDATE chat_summaries s
+                SET summarized_count = GREATEST(s.summarized_count - dropped.count, 0)
+                FROM (SELECT session_id, count(*) AS count FROM {} GROUP BY session_id) dropped
+                WHERE s.session_id = dropped.session_id
+                """
+            ).format(sql.Identifier(name))
+        )
+        conn.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(name)))
+
+    if expired:
+        conn.execute(
+            """
+            DELETE FROM chat_summaries s
+            WHERE NOT EXISTS (SELECT 1 FROM chat_history h WHERE h.session_id = s.session_id)
+            """
+        )
+    return expired
+
+
+def run_maintenance(dry_run: bool = False) -> dict:
+    """
+    Create upcoming partitions and apply the retention policy.
+
+    Only one worker does the work at a time; the others skip.
+
+    Returns:
+        What was created and dropped
+    """
+    with get_connection_pool().connection() as conn:
+        if not is_history_partitioned(conn):
+            return {"status": "not_partitioned"}
+
+        locked = conn.execute("SELECT pg_try_advisory_xact_lock(hashtext('chat_history_maintenance'))").fetchone()[0]
+        if not locked:
+            return {"status": "skipped"}
+
+        created = [] if dry_run else ensure_history_partitions(conn)
+        dropped = []
+        if settings.HISTORY_RETENTION_DAYS > 0:
+            dropped = drop_expired_partitions(conn, settings.HISTORY_RETENTION_DAYS, dry_run)
+
+    # Windows cached before the drop count messages that no longer exist
+    if dropped and not dry_run:
+        history_cache.clear()
+
+    return {"status": "dry_run" if dry_run else "ok", "created": created, "dropped": dropped}
+
+
+async def maintenance_loop(after: asyncio.Task | None = None) -> None:
+    """
+    Run maintenance, then again every HISTORY_MAINTENANCE_HOURS.
+
+    Args:
+        after: Task to wait for first (the startup warmup, which opens the pool)
+    """
+    if after is not None:
+        await asyncio.wait([after])
+
+    while True:
+        try:
+            report = await asyncio.to_thread(run_maintenance)
+            if report.get("created") or report.get("dropped"):
+                logger.info(f"Chat history maintenance: {report}")
+        except Exception as e:
+            logger.warning(f"Chat history maintenance failed: {e}")
+        await asyncio.sleep(settings.HISTORY_MAINTENANCE_HOURS * 3600)
+
+
+def migrate_to_partitioned(drop_legacy: bool = False) -> dict:
+    """
+    Move a flat chat_history table into the partitioned layout.
+
+    Runs in one transaction with the old table locked: it is renamed to
+    chat_history_legacy, its rows are copied in id order (keeping ids and
+    timestamps, re-encoding messages in the compact format) and the id
+    sequence continues after the last copied row.
+
+    Args:
+        drop_legacy: Drop chat_history_legacy afterwards instead of keeping it
+
+    Returns:
+        Rows copied and table sizes before and after
+    """
+    start = time.perf_counter()
+    with get_connection_pool().connection() as conn:
+        if conn.execute("SELECT to_regclass('chat_history')").fetchone()[0] is None:
+            return {"status": "no_table"}
+        if is_history_partitioned(conn):
+            return {"status": "already_partitioned"}
+
+        conn.execute("LOCK TABLE chat_history IN ACCESS EXCLUSIVE MODE")
+        legacy_bytes = conn.execute("SELECT pg_total_relation_size('chat_history')").fetchone()[0]
+
+        # Free the names the partitioned table will use
+        conn.execute("ALTER TABLE chat_history RENAME TO chat_history_legacy")
+        conn.execute("ALTER INDEX IF EXISTS chat_history_pkey RENAME TO chat_history_legacy_pkey")
+        conn.execute("ALTER INDEX IF EXISTS idx_chat_history_session_id RENAME TO idx_chat_history_legacy_session_id")
+        conn.execute("ALTER SEQUENCE IF EXISTS chat_history_id_seq RENAME TO chat_history_legacy_id_seq")
+        conn.execute(CHAT_HISTORY_SQL)
+
+        oldest = conn.execute("SELECT min(created_at) FROM chat_history_legacy").fetchone()[0]
+        ensure_history_partitions(conn, since=oldest.date() if oldest else None)
+
+        copied = 0
+        with conn.cursor(name="legacy_rows") as source, conn.cursor() as target:
+            source.execute(
+                """
+                SELECT id, session_id, message, COALESCE(created_at, CURRENT_TIMESTAMP)
+                FROM chat_history_legacy ORDER BY id
+                """
+            )
+            while rows := source.fetchmany(MIGRATION_BATCH_SIZE):
+                messages = decode_messages([row[2] for row in rows])
+                target.executemany(
+                    "INSERT INTO chat_history (id, session_id, message, created_at) VALUES (%s, %s, %s, %s)",
+                    [
+                        (row[0], row[1], json.dumps(encode_message(message)), row[3])
+                        for row, message in zip(rows, messages)
+                    ],
+                )
+                copied += len(rows)
+
+        conn.execute(
+            "SELECT setval(pg_get_serial_sequence('chat_history', 'id'), "
+            "COALESCE((SELECT max(id) FROM chat_history), 0) + 1, false)"
+        )
+        if drop_legacy:
+            conn.execute("DROP TABLE chat_history_legacy")
+
+        partitioned_bytes = conn.execute(
+            """
+            SELECT COALESCE(sum(pg_total_relation_size(inhrelid)), 0)
+            FROM pg_inherits WHERE inhparent = 'chat_history'::regclass
+            """
+        ).fetchone()[0]
+
+    history_cache.clear()
+    return {
+        "status": "migrated",
+        "rows": copied,
+        "legacy_bytes": legacy_bytes,
+        "partitioned_bytes": int(partitioned_bytes),
+        "legacy_dropped": drop_legacy,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chat history partitions and retention")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subcommands.add_parser("run", help="Create upcoming partitions and apply retention")
+    run_parser.add_argument("--dry-run", action="store_true", help="Only list partitions that would be dropped")
+
+    migrate_parser = subcommands.add_parser("migrate", help="Move a flat chat_history table into partitions")
+    migrate_parser.add_argument("--drop-legacy", action="store_true", help="Drop the old table afterwards")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        report = run_maintenance(dry_run=args.dry_run)
+    else:
+        report = migrate_to_partitioned(drop_legacy=args.drop_legacy)
+    print(json.dumps(report, indent=2))
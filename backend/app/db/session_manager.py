@@ -1,16 +1,36 @@
+import json
+import logging
 from contextlib import contextmanager
-from functools import lru_cache
+from datetime import date
+from typing import Sequence
 
-import psycopg
-from langchain_postgres import PostgresChatMessageHistory
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+from psycopg import sql
 from psycopg_pool import ConnectionPool
 
+from app.db.history_cache import SessionWindow, history_cache
 from app.settings import settings
 
+logger = logging.getLogger(__name__)
+
 # Connection pool for database
 _connection_pool: ConnectionPool | None = None
 _table_initialized: bool = False
 
+CHAT_HISTORY_SQL = """
+    CREATE TABLE IF NOT EXISTS chat_history (
+        id BIGSERIAL,
+        session_id TEXT NOT NULL,
+        message JSONB NOT NULL,
+        created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at);
+
+    CREATE INDEX IF NOT EXISTS idx_chat_history_session_id
+    ON chat_history(session_id, id);
+"""
+
 
 def get_connection_pool() -> ConnectionPool:
     """Get or create sync connection pool."""
@@ -25,8 +45,53 @@ def get_connection_pool() -> ConnectionPool:
     return _connection_pool
 
 
+def is_history_partitioned(conn) -> bool:
+    """Whether chat_history is the partitioned table (False for the original flat table)."""
+    row = conn.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('chat_history')").fetchone()
+    return row is not None and row[0] == "p"
+
+
+def _add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def ensure_history_partitions(conn, since: date | None = None) -> list[str]:
+    """
+    Create the monthly chat_history partitions that don't exist yet.
+
+    Args:
+        conn: Database connection
+        since: First month to cover (defaults to the current month)
+
+    Returns:
+        Names of the partitions created
+    """
+    # Serializes workers starting at the same time; released at commit
+    conn.execute("SELECT pg_advisory_xact_lock(hashtext('chat_history_partitions'))")
+    today = conn.execute("SELECT CURRENT_DATE").fetchone()[0]
+    month = (since or today).replace(day=1)
+    last = _add_months(today.replace(day=1), settings.HISTORY_PARTITIONS_AHEAD)
+
+    created = []
+    while month <= last:
+        name = f"chat_history_p{month:%Y_%m}"
+        exists = conn.execute("SELECT to_regclass(%s)", (name,)).fetchone()[0]
+        if exists is None:
+            conn.execute(
+                sql.SQL("CREATE TABLE {} PARTITION OF chat_history FOR VALUES FROM ({}) TO ({})").format(
+                    sql.Identifier(name),
+                    sql.Literal(month.isoformat()),
+                    sql.Literal(_add_months(month, 1).isoformat()),
+                )
+            )
+            created.append(name)
+        month = _add_months(month, 1)
+    return created
+
+
 def _ensure_table_exists():
-    """Ensure the chat_history table exists."""
+    """Ensure the chat_history (with its partitions) and chat_summaries tables exist."""
     global _table_initialized
     if _table_initialized:
         return
@@ -36,49 +101,236 @@ def _ensure_table_exists():
     
     try:
         with connection.cursor() as cursor:
-            # Create table if not exists (from langchain-postgres schema)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS chat_history (
-                    id SERIAL PRIMARY KEY,
-                    session_id TEXT NOT NULL,
-                    message JSONB NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            cursor.execute(CHAT_HISTORY_SQL + """
+                CREATE TABLE IF NOT EXISTS chat_summaries (
+                    session_id TEXT PRIMARY KEY,
+                    summary TEXT NOT NULL,
+                    summarized_count INTEGER NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 );
-                
-                CREATE INDEX IF NOT EXISTS idx_chat_history_session_id 
-                ON chat_history(session_id);
             """)
-            connection.commit()
+
+        if is_history_partitioned(connection):
+            ensure_history_partitions(connection)
+        else:
+            logger.warning(
+                "chat_history is not partitioned; run `python -m app.db.retention migrate` "
+                "to enable retention"
+            )
+        connection.commit()
         
         _table_initialized = True
     finally:
         pool.putconn(connection)
 
 
+# Message defaults that the compact format leaves out
+_DEFAULT_VALUES = (None, False, "", {}, [])
+
+
+def encode_message(message: BaseMessage) -> dict:
+    """
+    Compact JSON form of a message: {"t": type, "c": content, ...}.
+
+    Only fields that differ from their defaults are kept, instead of
+    LangChain's full {"type", "data": {...}} form with every field spelled out.
+    """
+    data = message_to_dict(message)["data"]
+    compact = {"t": message.type, "c": data.pop("content")}
+    for key, value in data.items():
+        if key != "type" and not any(value == default and type(value) is type(default) for default in _DEFAULT_VALUES):
+            compact[key] = value
+    return compact
+
+
+def decode_messages(items: list[dict]) -> list[BaseMessage]:
+    """Decode stored messages, compact or in LangChain's original format."""
+    expanded = []
+    for item in items:
+        if "t" in item:
+            data = {key: value for key, value in item.items() if key not in ("t", "c")}
+            expanded.append({"type": item["t"], "data": {"content": item["c"], **data}})
+        else:
+            expanded.append(item)
+    return messages_from_dict(expanded)
+
+
+class ChatHistory(BaseChatMessageHistory):
+    """
+    Chat history of one session in the chat_history table.
+
+    Messages are stored in the compact format (older rows in LangChain's
+    format are still read). Each operation borrows a pooled connection
+    only for as long as it runs. With history_cache enabled, recent-window
+    reads are served from it when possible; writes go to Postgres first, then
+    to the cache.
+    """
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+
+    @property
+    def messages(self) -> list[BaseMessage]:
+        """All messages of the session, oldest first."""
+        with get_connection_pool().connection() as conn:
+            rows = conn.execute(
+                "SELECT message FROM chat_history WHERE session_id = %s ORDER BY id",
+                (self.session_id,),
+            ).fetchall()
+
+        messages = decode_messages([row[0] for row in rows])
+        history_cache.put(self.session_id, SessionWindow(len(messages), messages))
+        return messages
+
+    def recent(self) -> SessionWindow:
+        """The last messages of the session (at least HISTORY_RECENT_MESSAGES) and its total count."""
+        window = history_cache.get(self.session_id)
+        if window is not None:
+            return window
+
+        with get_connection_pool().connection() as conn:
+            # count(*) OVER () is computed before LIMIT, so it is the session's total
+            rows = conn.execute(
+                """
+                SELECT message, count(*) OVER ()
+                FROM chat_history WHERE session_id = %s
+                ORDER BY id DESC LIMIT %s
+                """,
+                (self.session_id, history_cache.window),
+            ).fetchall()
+
+        messages = decode_messages([row[0] for row in reversed(rows)])
+        window = SessionWindow(rows[0][1] if rows else 0, messages)
+        history_cache.put(self.session_id, window)
+        return window
+
+    def read_from(self, start: int) -> SessionWindow:
+        """
+        The messages of the session from position `start` on, and its total count.
+
+        Lets callers that only need the tail past a known point (such as the
+        summarizer) skip reading and decoding everything before it.
+        """
+        with get_connection_pool().connection() as conn:
+            # count(*) OVER () is computed before OFFSET, so it is the session's total
+            rows = conn.execute(
+                """
+                SELECT message, count(*) OVER ()
+                FROM chat_history WHERE session_id = %s
+                ORDER BY id OFFSET %s
+                """,
+                (self.session_id, start),
+            ).fetchall()
+
+        if not rows:
+            # Nothing past start; the total is only needed to know there is nothing to do
+            return SessionWindow(start, [])
+        return SessionWindow(rows[0][1], decode_messages([row[0] for row in rows]))
+
+    def has_replies(self, excluding_name: str | None = None) -> bool:
+        """
+        Whether the session has an assistant reply (i.e. this is not its first real turn).
+
+        Args:
+            excluding_name: Replies stored with this message name don't count
+        """
+        window = history_cache.get(self.session_id)
+        if window is not None:
+            replies = [message for message in window.messages if message.type == "ai"]
+            if any(excluding_name is None or message.name != excluding_name for message in replies):
+                return True
+            if window.offset == 0:
+                return False
+
+        with get_connection_pool().connection() as conn:
+            # Both the compact ({"t", "name"}) and LangChain's ({"type", "data": {"name"}}) formats
+            row = conn.execute(
+                """
+                SELECT EXISTS (
+                    SELECT 1 FROM chat_history
+                    WHERE session_id = %s
+                      AND COALESCE(message->>'t', message->>'type') = 'ai'
+                      AND COALESCE(message->>'name', message->'data'->>'name', '') <> %s
+                )
+                """,
+                (self.session_id, excluding_name or ""),
+            ).fetchone()
+        return row[0]
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        """Append messages (one round trip) and update the cached window."""
+        with get_connection_pool().connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.executemany(
+                    "INSERT INTO chat_history (session_id, message) VALUES (%s, %s)",
+                    [(self.session_id, json.dumps(encode_message(message))) for message in messages],
+                )
+        history_cache.append(self.session_id, list(messages))
+
+    def clear(self) -> None:
+        """Delete every message of the session."""
+        with get_connection_pool().connection() as conn:
+            conn.execute("DELETE FROM chat_history WHERE session_id = %s", (self.session_id,))
+        history_cache.invalidate(self.session_id)
+
+
 @contextmanager
 def get_session_history(session_id: str):
     """
-    Context manager for PostgresChatMessageHistory.
-    
-    Properly manages connection pool lifecycle:
-    - Gets a connection from the pool
-    - Yields PostgresChatMessageHistory
-    - Returns connection to pool after use
-    
+    Context manager for a session's ChatHistory.
+
+    Connections are borrowed from the pool per operation, so a turn doesn't
+    hold one while the agent runs.
+
     Usage:
         with get_session_history(session_id) as history:
             messages = history.messages
             history.add_user_message(...)
     """
     _ensure_table_exists()
-    
-    pool = get_connection_pool()
-    
-    # Use pool's context manager to automatically return connection
-    with pool.connection() as conn:
-        history = PostgresChatMessageHistory(
-            "chat_history",
-            session_id,
-            sync_connection=conn,
+    yield ChatHistory(session_id)
+
+
+def get_session_summary(session_id: str) -> tuple[str, int] | None:
+    """
+    Get the running summary of a session.
+
+    Returns:
+        (summary, number of leading messages it covers), or None if the
+        session has no summary yet
+    """
+    _ensure_table_exists()
+
+    with get_connection_pool().connection() as conn:
+        row = conn.execute(
+            "SELECT summary, summarized_count FROM chat_summaries WHERE session_id = %s",
+            (session_id,),
+        ).fetchone()
+
+    return (row[0], row[1]) if row else None
+
+
+def save_session_summary(session_id: str, summary: str, summarized_count: int):
+    """Insert or replace the running summary of a session."""
+    _ensure_table_exists()
+
+    with get_connection_pool().connection() as conn:
+        conn.execute(
+            """
+            INSERT INTO chat_summaries (session_id, summary, summarized_count, updated_at)
+            VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
+            ON CONFLICT (session_id) DO UPDATE SET
+                summary = EXCLUDED.summary,
+                summarized_count = EXCLUDED.summarized_count,
+                updated_at = EXCLUDED.updated_at
+            """,
+            (session_id, summary, summarized_count),
         )
-        yield history
+
+
+def delete_session_summary(session_id: str):
+    """Delete the running summary of a session."""
+    _ensure_table_exists()
+
+    with get_connection_pool().connection() as conn:
+        conn.execute("DELETE FROM chat_summaries WHERE session_id = %s", (session_id,))
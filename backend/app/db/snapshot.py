@@ -0,0 +1,364 @@
+"""
+Vector store snapshots.
+
+Exports the coffee_documents collection (chunks, metadata, embeddings and the
+embedding model/dimension they were made with) to a single binary file, and
+bulk-loads such a file into another database. Neither direction calls the
+embeddings API, so a new environment can be bootstrapped offline.
+
+File layout (all integers little-endian):
+    magic   b"CFSNAP01"
+    u32     header length, then the JSON header
+    column  ids        (u64 length + zlib-compressed JSON list)
+    column  documents  (u64 length + zlib-compressed JSON list)
+    column  metadata   (u64 length + zlib-compressed JSON list)
+    column  embeddings (u64 length + raw float32 matrix, count x dimension)
+
+Usage:
+    python -m app.db.snapshot export coffee_documents.cfsnap
+    python -m app.db.snapshot import coffee_documents.cfsnap [--replace]
+"""
+import argparse
+import hashlib
+import json
+import struct
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import psycopg
+from pgvector.psycopg import register_vector
+from psycopg.types.json import Json, Jsonb
+
+from app.db.vector_store import COLLECTION_NAME, EMBEDDING_MODEL
+from app.settings import settings
+
+MAGIC = b"CFSNAP01"
+COLUMNS = ("ids", "documents", "metadata", "embeddings")
+
+# Same schema langchain-postgres creates, so PGVector can use an imported database as is
+SCHEMA_SQL = """
+    CREATE EXTENSION IF NOT EXISTS vector;
+
+    CREATE TABLE IF NOT EXISTS langchain_pg_collection (
+        uuid UUID PRIMARY KEY,
+        name VARCHAR NOT NULL UNIQUE,
+        cmetadata JSON
+    );
+
+    CREATE TABLE IF NOT EXISTS langchain_pg_embedding (
+        id VARCHAR PRIMARY KEY,
+        collection_id UUID REFERENCES langchain_pg_collection (uuid) ON DELETE CASCADE,
+        embedding VECTOR,
+        document VARCHAR,
+        cmetadata JSONB
+    );
+"""
+
+CREATE_INDEX_SQL = """
+    CREATE INDEX IF NOT EXISTS ix_cmetadata_gin
+    ON langchain_pg_embedding USING gin (cmetadata jsonb_path_ops)
+"""
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot file is invalid or doesn't match the target."""
+
+
+def _read_column(file, digest) -> bytes:
+    (length,) = struct.unpack("<Q", file.read(8))
+    data = file.read(length)
+    if len(data) != length:
+        raise SnapshotError("Snapshot file is truncated")
+    digest.update(data)
+    return data
+
+
+def write_snapshot(
+    path: str,
+    collection: str,
+    collection_metadata: dict | None,
+    ids: list[str],
+    documents: list[str],
+    metadata: list[dict],
+    embeddings: np.ndarray,
+) -> dict:
+    """
+    Write rows to a snapshot file, atomically.
+
+    Returns:
+        The snapshot header
+    """
+    columns = {
+        "ids": zlib.compress(json.dumps(ids).encode("utf-8")),
+        "documents": zlib.compress(json.dumps(documents, ensure_ascii=False).encode("utf-8")),
+        "metadata": zlib.compress(json.dumps(metadata, ensure_ascii=False).encode("utf-8")),
+        "embeddings": np.ascontiguousarray(embeddings, dtype="<f4").tobytes(),
+    }
+
+    header = {
+        "format_version": 1,
+        "collection": collection,
+        "collection_metadata": collection_metadata,
+        "embedding_model": EMBEDDING_MODEL,
+        "dimension": int(embeddings.shape[1]),
+        "count": len(ids),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "sha256": hashlib.sha256(b"".join(columns[name] for name in COLUMNS)).hexdigest(),
+    }
+
+    tmp = Path(path).with_suffix(".tmp")
+    with open(tmp, "wb") as file:
+        file.write(MAGIC)
+        header_bytes = json.dumps(header).encode("utf-8")
+        file.write(struct.pack("<I", len(header_bytes)))
+        file.write(header_bytes)
+        for name in COLUMNS:
+            file.write(struct.pack("<Q", len(columns[name])))
+            file.write(columns[name])
+    tmp.replace(path)
+
+    return header
+
+
+def export_snapshot(path: str, collection: str = COLLECTION_NAME) -> dict:
+    """
+    Export a collection to a snapshot file.
+
+    Args:
+        path: Output file
+        collection: Collection name
+
+    Returns:
+        The snapshot header
+    """
+    with psycopg.connect(settings.DATABASE_URL) as conn:
+        register_vector(conn)
+        row = conn.execute(
+            "SELECT uuid, cmetadata FROM langchain_pg_collection WHERE name = %s",
+            (collection,),
+        ).fetchone()
+        if row is None:
+            raise SnapshotError(f"Collection '{collection}' not found")
+        collection_id, collection_metadata = row
+
+        rows = conn.execute(
+            """
+            SELECT id, document, cmetadata, embedding
+            FROM langchain_pg_embedding
+            WHERE collection_id = %s
+            ORDER BY id
+            """,
+            (collection_id,),
+        ).fetchall()
+
+    if not rows:
+        raise SnapshotError(f"Collection '{collection}' is empty")
+
+    return write_snapshot(
+        path,
+        collection,
+        collection_metadata,
+        ids=[row[0] for row in rows],
+        documents=[row[1] for row in rows],
+        metadata=[row[2] for row in rows],
+        embeddings=np.stack([np.asarray(row[3], dtype="<f4") for row in rows]),
+    )
+
+
+def read_snapshot(path: str) -> tuple[dict, dict]:
+    """
+    Read and verify a snapshot file.
+
+    Args:
+        path: Snapshot file
+
+    Returns:
+        (header, columns) with columns decoded: ids, documents, metadata
+        lists and an embeddings matrix
+
+    Raises:
+        SnapshotError: If the file is not a valid snapshot
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise SnapshotError(f"{path} is not a snapshot file")
+        (header_length,) = struct.unpack("<I", file.read(4))
+        header = json.loads(file.read(header_length))
+        raw = {name: _read_column(file, digest) for name in COLUMNS}
+
+    if digest.hexdigest() != header["sha256"]:
+        raise SnapshotError("Snapshot checksum mismatch (file corrupted?)")
+
+    columns = {
+        name: json.loads(zlib.decompress(raw[name]))
+        for name in ("ids", "documents", "metadata")
+    }
+    columns["embeddings"] = np.frombuffer(raw["embeddings"], dtype="<f4").reshape(
+        header["count"], header["dimension"]
+    )
+    return header, columns
+
+
+def import_snapshot(path: str, replace: bool = False, force_model: bool = False) -> dict:
+    """
+    Bulk-load a snapshot into the database.
+
+    Rows are loaded with binary COPY while the metadata index is dropped, then
+    the index is rebuilt, the table analyzed and the result validated, all in
+    one transaction.
+
+    Args:
+        path: Snapshot file
+        replace: Replace an existing, non-empty collection
+        force_model: Import even if the snapshot was made with another embedding model
+
+    Returns:
+        Import stats
+
+    Raises:
+        SnapshotError: If the snapshot doesn't fit the target database
+    """
+    timings = {}
+    start = time.perf_counter()
+    header, columns = read_snapshot(path)
+    timings["read"] = time.perf_counter() - start
+
+    if header["embedding_model"] != EMBEDDING_MODEL and not force_model:
+        raise SnapshotError(
+            f"Snapshot uses {header['embedding_model']} but this app embeds queries with "
+            f"{EMBEDDING_MODEL}; pass --force-model to import anyway"
+        )
+
+    with psycopg.connect(settings.DATABASE_URL) as conn:
+        conn.execute(SCHEMA_SQL)
+        register_vector(conn)
+
+        row = conn.execute(
+            "SELECT uuid FROM langchain_pg_collection WHERE name = %s",
+            (header["collection"],),
+        ).fetchone()
+        if row is None:
+            collection_id = uuid.uuid4()
+            conn.execute(
+                "INSERT INTO langchain_pg_collection (uuid, name, cmetadata) VALUES (%s, %s, %s)",
+                (collection_id, header["collection"], Json(header["collection_metadata"])),
+            )
+        else:
+            collection_id = row[0]
+            existing = conn.execute(
+                "SELECT count(*) FROM langchain_pg_embedding WHERE collection_id = %s",
+                (collection_id,),
+            ).fetchone()[0]
+            if existing and not replace:
+                raise SnapshotError(
+                    f"Collection '{header['collection']}' already has {existing} rows; pass --replace"
+                )
+            conn.execute("DELETE FROM langchain_pg_embedding WHERE collection_id = %s", (collection_id,))
+
+        start = time.perf_counter()
+        conn.execute("DROP INDEX IF EXISTS ix_cmetadata_gin")
+        with conn.cursor().copy(
+            "COPY langchain_pg_embedding (id, collection_id, embedding, document, cmetadata) "
+            "FROM STDIN (FORMAT BINARY)"
+        ) as copy:
+            copy.set_types(["varchar", "uuid", "vector", "varchar", "jsonb"])
+            for i, chunk_id in enumerate(columns["ids"]):
+                copy.write_row((
+                    chunk_id,
+                    collection_id,
+                    columns["embeddings"][i],
+                    columns["documents"][i],
+                    Jsonb(columns["metadata"][i]),
+                ))
+        timings["copy"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        conn.execute(CREATE_INDEX_SQL)
+        conn.execute("ANALYZE langchain_pg_embedding")
+        timings["index"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        validate_import(conn, collection_id, header, columns)
+        timings["validate"] = time.perf_counter() - start
+
+    return {
+        "rows": header["count"],
+        "dimension": header["dimension"],
+        "seconds": {name: round(seconds, 3) for name, seconds in timings.items()},
+        "total_seconds": round(sum(timings.values()), 3),
+    }
+
+
+def validate_import(conn: psycopg.Connection, collection_id, header: dict, columns: dict, samples: int = 50) -> None:
+    """
+    Check row count and a deterministic sample of rows against the snapshot.
+
+    Raises:
+        SnapshotError: If the database doesn't match the snapshot
+    """
+    count = conn.execute(
+        "SELECT count(*) FROM langchain_pg_embedding WHERE collection_id = %s",
+        (collection_id,),
+    ).fetchone()[0]
+    if count != header["count"]:
+        raise SnapshotError(f"Expected {header['count']} rows, found {count}")
+
+    step = max(len(columns["ids"]) // samples, 1)
+    for i in range(0, len(columns["ids"]), step):
+        document, embedding = conn.execute(
+            "SELECT document, embedding FROM langchain_pg_embedding WHERE id = %s",
+            (columns["ids"][i],),
+        ).fetchone()
+        if document != columns["documents"][i] or not np.allclose(embedding, columns["embeddings"][i]):
+            raise SnapshotError(f"Row {columns['ids'][i]} doesn't match the snapshot")
+
+
+def last_ingestion_report() -> dict | None:
+    """Get the report of the most recent completed ingestion run, for comparison."""
+    for report_path in sorted(Path(settings.INGESTION_RUNS_DIR).glob("*/report.json"), reverse=True):
+        report = json.loads(report_path.read_text(encoding="utf-8"))
+        if report["status"] == "completed":
+            return report
+    return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export or import a vector store snapshot")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Write the collection to a snapshot file")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--collection", default=COLLECTION_NAME)
+
+    import_parser = subparsers.add_parser("import", help="Bulk-load a snapshot file")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--replace", action="store_true", help="Replace existing rows")
+    import_parser.add_argument("--force-model", action="store_true", help="Ignore embedding model mismatch")
+
+    args = parser.parse_args()
+
+    print(f"\n{'='*60}")
+    if args.command == "export":
+        start = time.perf_counter()
+        header = export_snapshot(args.path, args.collection)
+        size_mb = Path(args.path).stat().st_size / 1024 / 1024
+        print(f"✓ Exported {header['count']} chunks ({header['dimension']} dims, {header['embedding_model']})")
+        print(f"  File: {args.path} ({size_mb:.1f} MB)")
+        print(f"  Time elapsed: {time.perf_counter() - start:.1f}s")
+    else:
+        stats = import_snapshot(args.path, replace=args.replace, force_model=args.force_model)
+        print(f"✓ Imported {stats['rows']} chunks ({stats['dimension']} dims)")
+        for stage, seconds in stats["seconds"].items():
+            print(f"  {stage:<10} {seconds:>8.2f}s")
+        print(f"  Total:     {stats['total_seconds']:>8.2f}s")
+
+        report = last_ingestion_report()
+        if report:
+            print(f"\n  Last full ingestion ({report['run_id']}): {report['elapsed_seconds']:.1f}s"
+                  f" -> snapshot import is {report['elapsed_seconds'] / stats['total_seconds']:.0f}x faster")
+    print(f"{'='*60}")
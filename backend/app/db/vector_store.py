@@ -1,31 +1,68 @@
 from functools import lru_cache
+from typing import TYPE_CHECKING
 
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_postgres import PGVector
+from langchain_core.embeddings import Embeddings
 
 from app.settings import settings
+from app.singleflight import SingleFlight
 
+# Heavy client libraries are imported lazily so importing the app stays cheap
+if TYPE_CHECKING:
+    from langchain_postgres import PGVector
 
-def get_embeddings() -> GoogleGenerativeAIEmbeddings:
+EMBEDDING_MODEL = "gemini-embedding-001"
+COLLECTION_NAME = "coffee_documents"
+
+
+class CoalescingEmbeddings(Embeddings):
+    """Embeddings wrapper that shares in-flight requests for identical texts."""
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+        self._flights = SingleFlight("embeddings")
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._flights.do(("documents", tuple(texts)), self.embeddings.embed_documents, texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._flights.do(("query", text), self.embeddings.embed_query, text)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return await self._flights.ado(
+            ("documents", tuple(texts)),
+            lambda: self.embeddings.aembed_documents(texts),
+        )
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return await self._flights.ado(("query", text), lambda: self.embeddings.aembed_query(text))
+
+
+def get_embeddings() -> Embeddings:
     """Get Gemini embeddings model. Uses gemini-embedding-001 (models/embedding-001 is deprecated)."""
-    return GoogleGenerativeAIEmbeddings(
-        model="gemini-embedding-001",
-        google_api_key=settings.GOOGLE_API_KEY,
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+    return CoalescingEmbeddings(
+        GoogleGenerativeAIEmbeddings(
+            model=EMBEDDING_MODEL,
+            google_api_key=settings.GOOGLE_API_KEY,
+        )
     )
 
 
 @lru_cache(maxsize=1)
-def get_vector_store() -> PGVector:
+def get_vector_store() -> "PGVector":
     """
     Get PGVector store instance (cached).
     Single instance per process avoids SQLAlchemy 'Table already defined' errors
     when the RAG tool is called multiple times.
     """
+    from langchain_postgres import PGVector
+
     embeddings = get_embeddings()
     connection = settings.DATABASE_URL.replace("postgresql://", "postgresql+psycopg://")
     return PGVector(
         embeddings=embeddings,
-        collection_name="coffee_documents",
+        collection_name=COLLECTION_NAME,
         connection=connection,
         use_jsonb=True,
     )
@@ -0,0 +1,229 @@
+import gzip
+import json
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List
+
+from langchain_core.documents import Document
+
+from app.settings import settings
+
+
+def write_documents(path: Path, documents: List[Document], ids: List[str] | None = None) -> None:
+    """Write documents (and optional IDs) as gzipped JSON lines, atomically."""
+    tmp = path.with_suffix(".tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8") as file:
+        for i, doc in enumerate(documents):
+            record = {"text": doc.page_content, "metadata": doc.metadata}
+            if ids is not None:
+                record["id"] = ids[i]
+            file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+    tmp.replace(path)
+
+
+def read_documents(path: Path) -> tuple[List[Document], List[str]]:
+    """Read documents written by write_documents. IDs are empty if none were stored."""
+    documents, ids = [], []
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        for line in file:
+            record = json.loads(line)
+            documents.append(Document(page_content=record["text"], metadata=record["metadata"]))
+            if "id" in record:
+                ids.append(record["id"])
+    return documents, ids
+
+
+class IngestionRun:
+    """
+    Progress record of one ingestion run, stored under INGESTION_RUNS_DIR/<run_id>/.
+
+    - manifest.json: per-source and per-batch status plus stage timings
+    - sources/*.jsonl.gz: parsed documents of each finished source
+    - chunks.jsonl.gz: chunked documents with their IDs
+    - report.json: end-of-run report
+
+    A resumed run reuses every finished source and, if it was made from the
+    same sources, the chunk file, and continues embedding from the first
+    batch that wasn't committed.
+    """
+
+    def __init__(self, run_dir: Path, manifest: dict):
+        self.run_dir = run_dir
+        self.manifest = manifest
+
+    @property
+    def run_id(self) -> str:
+        return self.manifest["run_id"]
+
+    @classmethod
+    def create(cls) -> "IngestionRun":
+        """Start a new run."""
+        run_id = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        run_dir = Path(settings.INGESTION_RUNS_DIR) / run_id
+        (run_dir / "sources").mkdir(parents=True)
+
+        run = cls(
+            run_dir,
+            {
+                "run_id": run_id,
+                "status": "running",
+                "started_at": time.time(),
+                "attempts": 1,
+                "sources": {},
+                "batches": [],
+                "timings": {},
+            },
+        )
+        run.save()
+        return run
+
+    @classmethod
+    def load(cls, run_id: str | None = None) -> "IngestionRun":
+        """
+        Load a run to resume it.
+
+        Args:
+            run_id: Run to load; defaults to the most recent unfinished run
+
+        Raises:
+            FileNotFoundError: If there is no such run
+        """
+        runs_dir = Path(settings.INGESTION_RUNS_DIR)
+        if run_id is None:
+            candidates = sorted(runs_dir.glob("*/manifest.json"), reverse=True)
+            for manifest_path in candidates:
+                manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+                if manifest["status"] != "completed":
+                    run_id = manifest["run_id"]
+                    break
+            else:
+                raise FileNotFoundError(f"No unfinished ingestion run in {runs_dir}")
+
+        manifest_path = runs_dir / run_id / "manifest.json"
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        manifest["status"] = "running"
+        manifest["attempts"] += 1
+
+        run = cls(manifest_path.parent, manifest)
+        run.save()
+        return run
+
+    def save(self) -> None:
+        """Write the manifest atomically."""
+        tmp = self.run_dir / "manifest.tmp"
+        tmp.write_text(json.dumps(self.manifest, indent=2), encoding="utf-8")
+        tmp.replace(self.run_dir / "manifest.json")
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a stage; time spent across resumed attempts adds up."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.manifest["timings"][name] = round(self.manifest["timings"].get(name, 0.0) + elapsed, 3)
+            self.save()
+
+    # Sources
+
+    def _source_path(self, name: str) -> Path:
+        return self.run_dir / "sources" / f"{name}.jsonl.gz"
+
+    def source_done(self, name: str) -> bool:
+        return self.manifest["sources"].get(name, {}).get("status") == "done"
+
+    def save_source(self, name: str, documents: List[Document], **details) -> None:
+        """Persist a parsed source and mark it done."""
+        write_documents(self._source_path(name), documents)
+        self.manifest["sources"][name] = {"status": "done", "documents": len(documents), **details}
+        self.save()
+
+    def fail_source(self, name: str, error: str) -> None:
+        self.manifest["sources"][name] = {"status": "failed", "error": error}
+        self.save()
+
+    def load_source(self, name: str) -> List[Document]:
+        documents, _ = read_documents(self._source_path(name))
+        return documents
+
+    # Chunks and batches
+
+    @property
+    def _chunks_path(self) -> Path:
+        return self.run_dir / "chunks.jsonl.gz"
+
+    def has_chunks(self, sources: List[str]) -> bool:
+        """
+        Whether the chunk file can be reused: it exists and was made from exactly these sources.
+
+        A source that failed in an earlier attempt and parsed now (or one that
+        disappeared) changes the set, and the chunks must be made again.
+        """
+        return self._chunks_path.exists() and self.manifest.get("chunk_sources") == sorted(sources)
+
+    def save_chunks(self, chunks: List[Document], ids: List[str], batch_size: int, sources: List[str]) -> None:
+        """
+        Persist the chunks and (re-)plan their embedding batches.
+
+        Replanning marks every batch pending; batches stored by an earlier
+        plan are simply upserted again under the same stable IDs.
+        """
+        write_documents(self._chunks_path, chunks, ids)
+        total_batches = (len(chunks) + batch_size - 1) // batch_size
+        self.manifest["chunk_sources"] = sorted(sources)
+        self.manifest["batch_size"] = batch_size
+        self.manifest["batches"] = ["pending"] * total_batches
+        self.save()
+
+    def load_chunks(self) -> tuple[List[Document], List[str]]:
+        return read_documents(self._chunks_path)
+
+    def batch_done(self, index: int) -> bool:
+        return self.manifest["batches"][index] == "done"
+
+    def mark_batch_done(self, index: int) -> None:
+        self.manifest["batches"][index] = "done"
+        self.save()
+
+    # Completion
+
+    def finish(self, status: str, **details) -> dict:
+        """
+        Mark the run finished and write its report.
+
+        Args:
+            status: "completed" or "failed"
+            details: Extra fields for the report
+
+        Returns:
+            The report
+        """
+        self.manifest["status"] = status
+        self.manifest["finished_at"] = time.time()
+        self.save()
+
+        batches = self.manifest["batches"]
+        sources = self.manifest["sources"]
+        report = {
+            "run_id": self.run_id,
+            "status": status,
+            "attempts": self.manifest["attempts"],
+            "elapsed_seconds": round(sum(self.manifest["timings"].values()), 3),
+            "stage_seconds": self.manifest["timings"],
+            "sources": {
+                "done": sum(source["status"] == "done" for source in sources.values()),
+                "failed": sum(source["status"] == "failed" for source in sources.values()),
+                "documents": sum(source.get("documents", 0) for source in sources.values()),
+            },
+            "batches": {
+                "done": batches.count("done"),
+                "total": len(batches),
+            },
+            **details,
+        }
+        (self.run_dir / "report.json").write_text(json.dumps(report, indent=2), encoding="utf-8")
+        return report
@@ -0,0 +1,239 @@
+import asyncio
+import hashlib
+import json
+import re
+import time
+import xml.etree.ElementTree as ET
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import List
+from urllib.parse import urlparse
+
+import httpx
+from langchain_core.documents import Document
+
+from app.ingestion.web_scraper import html_to_documents
+from app.settings import settings
+
+USER_AGENT = "BrazilianCoffeeChatbot/1.0 (knowledge-base crawler)"
+
+SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+
+@dataclass
+class CacheEntry:
+    """What was fetched and stored for one URL on the last successful run."""
+
+    etag: str | None = None
+    last_modified: str | None = None
+    content_hash: str | None = None
+    fetched_at: float | None = None
+    chunk_ids: list[str] = field(default_factory=list)
+
+
+class FetchCache:
+    """
+    Persistent per-URL fetch cache (JSON file).
+
+    Holds validators for conditional GETs and a hash of the last body, so
+    unchanged pages are neither downloaded again nor re-embedded. Callers
+    save it only after the crawled documents have been stored.
+    """
+
+    def __init__(self, path: str, entries: dict[str, CacheEntry] | None = None):
+        self.path = Path(path)
+        self.entries = entries or {}
+
+    @classmethod
+    def load(cls, path: str) -> "FetchCache":
+        """Load the cache, or start an empty one if the file doesn't exist."""
+        file = Path(path)
+        if not file.exists():
+            return cls(path)
+
+        raw = json.loads(file.read_text(encoding="utf-8"))
+        return cls(path, {url: CacheEntry(**entry) for url, entry in raw.items()})
+
+    def save(self) -> None:
+        """Write the cache atomically."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(
+            json.dumps({url: asdict(entry) for url, entry in self.entries.items()}, indent=2),
+            encoding="utf-8",
+        )
+        tmp.replace(self.path)
+
+
+@dataclass
+class CrawlResult:
+    """Documents from pages that changed since the last run, plus fetch stats."""
+
+    documents: List[Document] = field(default_factory=list)
+    changed_urls: list[str] = field(default_factory=list)
+    stats: dict[str, int] = field(
+        default_factory=lambda: {"fetched": 0, "not_modified": 0, "unchanged": 0, "failed": 0}
+    )
+
+
+class HostLimiter:
+    """Per-host politeness: bounded concurrency and a minimum gap between requests."""
+
+    def __init__(self, concurrency: int, delay: float):
+        self.delay = delay
+        self._semaphores: dict[str, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(concurrency))
+        self._next_slot: dict[str, float] = {}
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        host = urlparse(url).netloc
+        async with self._semaphores[host]:
+            # Reserve the next start time for this host before sleeping
+            now = time.monotonic()
+            start = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = start + self.delay
+            if start > now:
+                await asyncio.sleep(start - now)
+            yield
+
+
+async def fetch_sitemap_urls(client: httpx.AsyncClient, sitemap_url: str, limiter: HostLimiter) -> list[str]:
+    """
+    List page URLs from a sitemap, following nested sitemap indexes.
+
+    Args:
+        client: HTTP client
+        sitemap_url: URL of a sitemap or sitemap index
+        limiter: Per-host politeness limiter
+
+    Returns:
+        Page URLs in sitemap order
+    """
+    async with limiter.slot(sitemap_url):
+        response = await client.get(sitemap_url)
+    response.raise_for_status()
+
+    root = ET.fromstring(response.content)
+    locations = [loc.text.strip() for loc in root.iter(f"{SITEMAP_NS}loc") if loc.text]
+
+    if root.tag != f"{SITEMAP_NS}sitemapindex":
+        return locations
+
+    urls = []
+    for nested in locations:
+        urls.extend(await fetch_sitemap_urls(client, nested, limiter))
+    return urls
+
+
+async def _fetch_page(
+    client: httpx.AsyncClient,
+    url: str,
+    cache: FetchCache,
+    limiter: HostLimiter,
+    semaphore: asyncio.Semaphore,
+    result: CrawlResult,
+) -> None:
+    """Conditionally fetch one page and record its documents if it changed."""
+    entry = cache.entries.get(url, CacheEntry())
+    headers = {}
+    if entry.etag:
+        headers["If-None-Match"] = entry.etag
+    if entry.last_modified:
+        headers["If-Modified-Since"] = entry.last_modified
+
+    try:
+        async with semaphore, limiter.slot(url):
+            response = await client.get(url, headers=headers)
+
+        if response.status_code == 304:
+            result.stats["not_modified"] += 1
+            return
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        print(f"  ✗ Error fetching {url}: {e}")
+        result.stats["failed"] += 1
+        return
+
+    result.stats["fetched"] += 1
+    content_hash = hashlib.sha256(response.content).hexdigest()
+    entry.etag = response.headers.get("ETag")
+    entry.last_modified = response.headers.get("Last-Modified")
+    entry.fetched_at = time.time()
+    cache.entries[url] = entry
+
+    # Servers without validators still answer 200; skip bodies we've already embedded
+    if content_hash == entry.content_hash:
+        result.stats["unchanged"] += 1
+        return
+
+    entry.content_hash = content_hash
+    result.documents.extend(html_to_documents(response.text, url))
+    result.changed_urls.append(url)
+
+
+async def crawl(cache: FetchCache, seeds: list[str] | None = None, sitemaps: list[str] | None = None) -> CrawlResult:
+    """
+    Crawl the configured seed pages and sitemap entries.
+
+    Pages are fetched concurrently (CRAWL_MAX_CONCURRENCY overall,
+    CRAWL_PER_HOST_CONCURRENCY and CRAWL_PER_HOST_DELAY per host) with
+    conditional GETs against the fetch cache. Only pages whose content
+    changed produce documents. The cache is updated in memory; save it once
+    the documents are stored.
+
+    Args:
+        cache: Fetch cache from the previous run
+        seeds: Page URLs (defaults to CRAWL_SEEDS)
+        sitemaps: Sitemap URLs (defaults to CRAWL_SITEMAPS)
+
+    Returns:
+        Documents from changed pages and fetch stats
+    """
+    seeds = settings.CRAWL_SEEDS if seeds is None else seeds
+    sitemaps = settings.CRAWL_SITEMAPS if sitemaps is None else sitemaps
+    url_pattern = re.compile(settings.CRAWL_URL_PATTERN) if settings.CRAWL_URL_PATTERN else None
+
+    limiter = HostLimiter(settings.CRAWL_PER_HOST_CONCURRENCY, settings.CRAWL_PER_HOST_DELAY)
+    semaphore = asyncio.Semaphore(settings.CRAWL_MAX_CONCURRENCY)
+    result = CrawlResult()
+
+    async with httpx.AsyncClient(
+        headers={"User-Agent": USER_AGENT},
+        follow_redirects=True,
+        timeout=httpx.Timeout(20.0),
+        limits=httpx.Limits(max_connections=settings.CRAWL_MAX_CONCURRENCY),
+    ) as client:
+        urls = list(seeds)
+        for sitemap in sitemaps:
+            try:
+                sitemap_urls = await fetch_sitemap_urls(client, sitemap, limiter)
+            except (httpx.HTTPError, ET.ParseError) as e:
+                print(f"  ✗ Error reading sitemap {sitemap}: {e}")
+                continue
+            urls.extend(url for url in sitemap_urls if not url_pattern or url_pattern.search(url))
+
+        # Keep order, drop duplicates, respect the page budget
+        urls = list(dict.fromkeys(urls))[: settings.CRAWL_MAX_PAGES]
+
+        await asyncio.gather(
+            *(_fetch_page(client, url, cache, limiter, semaphore, result) for url in urls)
+        )
+
+    return result
+
+
+def crawl_sync(cache: FetchCache, seeds: list[str] | None = None, sitemaps: list[str] | None = None) -> CrawlResult:
+    """Synchronous wrapper for crawl()."""
+    return asyncio.run(crawl(cache, seeds, sitemaps))
+
+
+if __name__ == "__main__":
+    # Dry run: shows what the next ingestion would fetch, without touching the cache file
+    cache = FetchCache.load(settings.CRAWL_CACHE_PATH)
+    result = crawl_sync(cache)
+    print(f"Crawl stats: {result.stats}")
+    print(f"Changed pages: {len(result.changed_urls)} -> {len(result.documents)} documents")
+    for url in result.changed_urls:
+        print(f"  {url}")
@@ -1,26 +1,35 @@
+import uuid
+from pathlib import Path
 from typing import List
 
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
-from app.db.vector_store import get_vector_store
-from app.ingestion.pdf_loader import load_all_pdfs
-from app.ingestion.web_scraper import scrape_aram_history_sync
+from app.db.vector_store import COLLECTION_NAME, get_vector_store
+from app.ingestion.checkpoint import IngestionRun
+from app.ingestion.crawler import FetchCache, crawl_sync
+from app.settings import settings
 
 
-def chunk_documents(documents: List[Document]) -> List[Document]:
+def chunk_documents(
+    documents: List[Document],
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+) -> List[Document]:
     """
     Split documents into smaller chunks for better retrieval.
 
     Args:
         documents: List of documents to chunk
+        chunk_size: Maximum characters per chunk
+        chunk_overlap: Characters shared by consecutive chunks
 
     Returns:
         List of chunked documents
     """
     text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
         length_function=len,
         separators=["\n\n", "\n", ". ", " ", ""],
     )
@@ -28,77 +37,276 @@ def chunk_documents(documents: List[Document]) -> List[Document]:
     return text_splitter.split_documents(documents)
 
 
-def ingest_all_documents(pdf_dir: str) -> int:
+def assign_chunk_ids(chunks: List[Document]) -> List[str]:
+    """
+    Derive stable IDs from each chunk's source and position within it.
+
+    Re-ingesting a source overwrites its previous chunks (PGVector upserts by
+    ID); delete_stale_chunks removes the ones the new version no longer has.
+
+    Args:
+        chunks: Chunked documents, in source order
+
+    Returns:
+        One ID per chunk
+    """
+    positions: dict[str, int] = {}
+    ids = []
+    for chunk in chunks:
+        source = chunk.metadata.get("source", "unknown")
+        position = positions.get(source, 0)
+        positions[source] = position + 1
+        ids.append(str(uuid.uuid5(uuid.NAMESPACE_URL, f"{source}#{position}")))
+    return ids
+
+
+def delete_stale_chunks(sources: set[str], ids: List[str], collection: str = COLLECTION_NAME) -> int:
+    """
+    Delete stored chunks of the given sources whose IDs aren't among ids.
+
+    Removes the tail of a source that got shorter, and the randomly-IDed rows
+    that ingestions before stable IDs left behind (those would otherwise sit
+    next to their re-ingested copies as duplicates).
+
+    Args:
+        sources: Sources that were just re-ingested
+        ids: IDs of every chunk just stored
+        collection: Collection name
+
+    Returns:
+        Number of rows deleted
+    """
+    import psycopg
+
+    if not sources:
+        return 0
+
+    with psycopg.connect(settings.DATABASE_URL) as conn:
+        deleted = conn.execute(
+            """
+            DELETE FROM langchain_pg_embedding e
+            USING langchain_pg_collection c
+            WHERE e.collection_id = c.uuid
+              AND c.name = %s
+              AND e.cmetadata->>'source' = ANY(%s)
+              AND NOT (e.id = ANY(%s))
+            """,
+            (collection, sorted(sources), list(ids)),
+        ).rowcount
+    return deleted
+
+
+def _parse_sources(run: IngestionRun, pdf_dir: str) -> tuple[List[Document], list[str], FetchCache, list[str]]:
+    """
+    Parse every PDF and crawl the web, reusing sources a previous attempt finished.
+
+    Returns:
+        Documents, names of the sources they came from, the updated fetch
+        cache and the URLs that changed
+    """
+    # Imported here so chunking, reporting and tests don't need the PDF extraction stack
+    from app.ingestion.pdf_loader import ExtractionStats, load_pdf
+
+    all_docs: List[Document] = []
+    parsed: list[str] = []
+
+    # Load PDFs
+    print("\n=== Loading PDFs ===")
+    with run.stage("parse_pdfs"):
+        for pdf_file in sorted(Path(pdf_dir).glob("*.pdf")):
+            if run.source_done(pdf_file.name):
+                docs = run.load_source(pdf_file.name)
+                print(f"Reusing: {pdf_file.name} ({len(docs)} documents)")
+                all_docs.extend(docs)
+                parsed.append(pdf_file.name)
+                continue
+
+            print(f"Processing: {pdf_file.name}")
+            try:
+                stats = ExtractionStats()
+                docs = load_pdf(str(pdf_file), stats)
+                run.save_source(pdf_file.name, docs, type="pdf", extraction=stats.as_dict())
+                all_docs.extend(docs)
+                parsed.append(pdf_file.name)
+                print(f"  ✓ Extracted {len(docs)} documents"
+                      f" ({stats.fast_pages} fast, {stats.ocr_pages} OCR, {stats.empty_pages} empty pages)")
+            except Exception as e:
+                run.fail_source(pdf_file.name, str(e))
+                print(f"  ✗ Error processing {pdf_file.name}: {e}")
+    print(f"Loaded {len(all_docs)} documents from PDFs")
+
+    # Crawl web content (only pages that changed since the last run)
+    print("\n=== Crawling Web Sources ===")
+    run_cache_path = run.run_dir / "fetch_cache.json"
+    with run.stage("crawl"):
+        if run.source_done("web"):
+            web_docs = run.load_source("web")
+            fetch_cache = FetchCache.load(str(run_cache_path))
+            changed_urls = run.manifest["sources"]["web"]["changed_urls"]
+            print(f"Reusing: web ({len(web_docs)} documents)")
+        else:
+            fetch_cache = FetchCache.load(settings.CRAWL_CACHE_PATH)
+            crawl = crawl_sync(fetch_cache)
+            web_docs, changed_urls = crawl.documents, crawl.changed_urls
+            print(f"Crawl stats: {crawl.stats}")
+
+            # Keep the updated validators with the run until the pages are stored
+            fetch_cache.path = run_cache_path
+            fetch_cache.save()
+            run.save_source("web", web_docs, type="web", changed_urls=changed_urls, crawl=crawl.stats)
+    print(f"Extracted {len(web_docs)} documents from {len(changed_urls)} changed pages")
+
+    return all_docs + web_docs, parsed + ["web"], fetch_cache, changed_urls
+
+
+def ingest_all_documents(pdf_dir: str, resume: str | None = None) -> dict:
     """
     Ingest all documents (PDFs and web content) into the vector store.
 
+    Progress is checkpointed (see IngestionRun): a resumed run skips sources
+    that were already parsed and embedding batches that were already stored.
+
     Args:
         pdf_dir: Path to directory containing PDFs
+        resume: Run ID to resume, "latest" for the most recent unfinished
+            run, or None to start a new run
 
     Returns:
-        Number of documents ingested
+        End-of-run report
     """
     print("Starting document ingestion...")
 
-    # Load PDFs
-    print("\n=== Loading PDFs ===")
-    pdf_docs = load_all_pdfs(pdf_dir)
-    print(f"Loaded {len(pdf_docs)} documents from PDFs")
-
-    # Scrape web content
-    print("\n=== Scraping ARAM Website ===")
-    web_docs = scrape_aram_history_sync()
-    print(f"Scraped {len(web_docs)} documents from web")
-
-    # Combine all documents
-    all_docs = pdf_docs + web_docs
-    print(f"\nTotal documents before chunking: {len(all_docs)}")
-
-    # Chunk documents
-    print("\n=== Chunking Documents ===")
-    chunked_docs = chunk_documents(all_docs)
-    print(f"Total chunks after splitting: {len(chunked_docs)}")
-
-    # Store in vector database
-    print("\n=== Storing in Vector Database ===")
-    print(f"Embedding and storing {len(chunked_docs)} chunks...")
-    print("This may take a few minutes (embedding generation + DB insert)...")
-    
-    vector_store = get_vector_store()
-    
-    # Add documents in batches with progress
-    batch_size = 50  # Smaller batches for more frequent updates
-    total_batches = (len(chunked_docs) + batch_size - 1) // batch_size
-    
-    for i in range(0, len(chunked_docs), batch_size):
-        batch = chunked_docs[i : i + batch_size]
-        batch_num = (i // batch_size) + 1
+    if resume:
+        run = IngestionRun.load(None if resume == "latest" else resume)
+        print(f"Resuming run {run.run_id} (attempt {run.manifest['attempts']})")
+    else:
+        run = IngestionRun.create()
+        print(f"Run ID: {run.run_id}")
+
+    try:
+        all_docs, sources, fetch_cache, changed_urls = _parse_sources(run, pdf_dir)
+
+        # Chunk documents
+        print("\n=== Chunking Documents ===")
+        batch_size = 50  # Smaller batches for more frequent updates
+        with run.stage("chunk"):
+            if run.has_chunks(sources):
+                chunked_docs, chunk_ids = run.load_chunks()
+                print(f"Reusing {len(chunked_docs)} chunks from the previous attempt")
+            else:
+                if run.manifest["batches"]:
+                    print("Sources changed since the previous attempt; chunking again")
+                print(f"\nTotal documents before chunking: {len(all_docs)}")
+                chunked_docs = chunk_documents(all_docs)
+                chunk_ids = assign_chunk_ids(chunked_docs)
+                run.save_chunks(chunked_docs, chunk_ids, batch_size, sources)
+        print(f"Total chunks after splitting: {len(chunked_docs)}")
+
+        # Store in vector database
+        print("\n=== Storing in Vector Database ===")
+        print(f"Embedding and storing {len(chunked_docs)} chunks...")
+        print("This may take a few minutes (embedding generation + DB insert)...")
         
-        vector_store.add_documents(batch)
+        vector_store = get_vector_store()
         
-        completed = min(i + batch_size, len(chunked_docs))
-        print(f"  [{batch_num}/{total_batches}] Processed {completed}/{len(chunked_docs)} chunks...")
-    
-    print("✓ Documents stored successfully!")
+        # Add documents in batches with progress
+        batch_size = run.manifest["batch_size"]
+        total_batches = len(run.manifest["batches"])
+        skipped_batches = 0
+
+        with run.stage("embed_and_store"):
+            for i in range(0, len(chunked_docs), batch_size):
+                batch_index = i // batch_size
+                if run.batch_done(batch_index):
+                    skipped_batches += 1
+                    continue
+
+                batch = chunked_docs[i : i + batch_size]
+                vector_store.add_documents(batch, ids=chunk_ids[i : i + batch_size])
+                run.mark_batch_done(batch_index)
+                
+                completed = min(i + batch_size, len(chunked_docs))
+                print(f"  [{batch_index + 1}/{total_batches}] Processed {completed}/{len(chunked_docs)} chunks...")
+
+        if skipped_batches:
+            print(f"  Skipped {skipped_batches} batches stored by a previous attempt")
+
+        with run.stage("cleanup"):
+            # Drop stored chunks of re-ingested sources that this version doesn't have
+            # (changed pages count even if they produced no chunks this time)
+            sources = {chunk.metadata.get("source", "unknown") for chunk in chunked_docs} | set(changed_urls)
+            stale_chunks = delete_stale_chunks(sources, chunk_ids)
+            if stale_chunks:
+                print(f"  Deleted {stale_chunks} stale chunks of re-ingested sources")
+
+            for url in changed_urls:
+                fetch_cache.entries[url].chunk_ids = [
+                    chunk_id
+                    for chunk, chunk_id in zip(chunked_docs, chunk_ids)
+                    if chunk.metadata.get("source") == url
+                ]
 
-    return len(chunked_docs)
+            # Only now that the pages are stored may the next run skip them
+            fetch_cache.path = Path(settings.CRAWL_CACHE_PATH)
+            fetch_cache.save()
+        
+        print("✓ Documents stored successfully!")
+    except BaseException as e:
+        run.finish("failed", error=str(e) or type(e).__name__)
+        print(f"\n✗ Ingestion failed. Resume with: python -m app.ingestion.embedder --resume {run.run_id}")
+        raise
+
+    # Per-strategy extraction totals, including sources parsed by earlier attempts
+    from app.ingestion.pdf_loader import ExtractionStats
+
+    extraction = ExtractionStats()
+    for source in run.manifest["sources"].values():
+        if "extraction" in source:
+            extraction.add(ExtractionStats(**source["extraction"]))
+
+    return run.finish(
+        "completed",
+        chunks=len(chunked_docs),
+        skipped_batches=skipped_batches,
+        pdf_extraction=extraction.as_dict(),
+    )
 
 
 if __name__ == "__main__":
+    import argparse
     import os
-    import time
 
-    start_time = time.time()
+    parser = argparse.ArgumentParser(description="Ingest PDFs and web pages into the vector store")
+    parser.add_argument(
+        "--resume",
+        nargs="?",
+        const="latest",
+        default=None,
+        metavar="RUN_ID",
+        help="Resume a run (default: the most recent unfinished one)",
+    )
+    args = parser.parse_args()
+
     pdf_dir = os.path.join(os.path.dirname(__file__), "..", "..", "pdfs")
-    count = ingest_all_documents(pdf_dir)
+    report = ingest_all_documents(pdf_dir, resume=args.resume)
     
-    elapsed = time.time() - start_time
+    elapsed = report["elapsed_seconds"]
     minutes = int(elapsed // 60)
     seconds = int(elapsed % 60)
     
     print(f"\n{'='*60}")
     print(f"✓ Ingestion Complete!")
     print(f"{'='*60}")
-    print(f"  Total chunks stored: {count}")
+    print(f"  Run ID: {report['run_id']} (attempt {report['attempts']})")
+    print(f"  Total chunks stored: {report['chunks']}")
+    print(f"  Sources: {report['sources']['done']} parsed, {report['sources']['failed']} failed")
+    print(f"  Batches: {report['batches']['done']}/{report['batches']['total']}"
+          f" ({report['skipped_batches']} reused)")
+    extraction = report["pdf_extraction"]
+    print(f"  PDF pages: {extraction['pages']} ({extraction['fast_pages']} fast in {extraction['fast_seconds']:.1f}s,"
+          f" {extraction['ocr_pages']} OCR in {extraction['ocr_seconds']:.1f}s,"
+          f" {extraction['empty_pages'] + extraction['ocr_failed_pages']} without text)")
+    for stage, stage_seconds in report["stage_seconds"].items():
+        print(f"  {stage:<16} {stage_seconds:>8.1f}s")
     print(f"  Time elapsed: {minutes}m {seconds}s")
     print(f"{'='*60}")
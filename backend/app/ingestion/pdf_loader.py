@@ -1,23 +1,84 @@
-import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
 from pathlib import Path
 from typing import List
 
 from langchain_core.documents import Document
-from unstructured.partition.pdf import partition_pdf
+from pdfminer.pdfpage import PDFPage
 
+from app.settings import settings
 
-def load_pdf(file_path: str) -> List[Document]:
+
+@dataclass
+class ExtractionStats:
+    """Per-strategy page coverage and timing of PDF extraction."""
+
+    pages: int = 0
+    fast_pages: int = 0
+    ocr_pages: int = 0
+    ocr_failed_pages: int = 0
+    empty_pages: int = 0
+    fast_chars: int = 0
+    ocr_chars: int = 0
+    fast_seconds: float = 0.0
+    ocr_seconds: float = 0.0
+
+    def add(self, other: "ExtractionStats") -> None:
+        for name, value in asdict(other).items():
+            setattr(self, name, getattr(self, name) + value)
+
+    def as_dict(self) -> dict:
+        stats = asdict(self)
+        stats["fast_seconds"] = round(self.fast_seconds, 3)
+        stats["ocr_seconds"] = round(self.ocr_seconds, 3)
+        return stats
+
+
+def count_pages(file_path: str) -> int:
+    """Count the pages of a PDF."""
+    with open(file_path, "rb") as file:
+        return sum(1 for _ in PDFPage.get_pages(file))
+
+
+def _ocr_page(file_path: str, page_number: int) -> str:
     """
-    Load a PDF file and extract text content.
+    OCR a single page (runs in a worker process).
 
     Args:
         file_path: Path to the PDF file
+        page_number: 1-based page number
 
     Returns:
-        List of Document objects with extracted content
+        Recognized text
     """
-    file_name = Path(file_path).name
+    import pytesseract
+    from pdf2image import convert_from_path
+
+    images = convert_from_path(
+        file_path,
+        dpi=settings.PDF_OCR_DPI,
+        first_page=page_number,
+        last_page=page_number,
+    )
+    return "\n".join(pytesseract.image_to_string(image, lang="por+eng") for image in images)
+
+
+def _extract_pages(file_path: str, stats: ExtractionStats) -> dict[int, List[str]]:
+    """
+    Extract the text of every page, choosing the strategy per page.
 
+    The whole file goes through the fast text-layer parser first. Pages that
+    come back (nearly) empty have no text layer, so only those are rendered
+    and sent to OCR, in parallel worker processes.
+
+    Returns:
+        Text elements keyed by 1-based page number
+    """
+    from unstructured.partition.pdf import partition_pdf
+
+    start = time.perf_counter()
     elements = partition_pdf(
         filename=file_path,
         strategy="fast",  # Fast strategy for text-based PDFs
@@ -26,24 +87,88 @@ def load_pdf(file_path: str) -> List[Document]:
         extract_images_in_pdf=False,
     )
 
+    pages: dict[int, List[str]] = defaultdict(list)
+    for element in elements:
+        text = str(element)
+        if text.strip():
+            pages[element.metadata.page_number or 1].append(text)
+
+    page_count = count_pages(file_path)
+    stats.pages += page_count
+    stats.fast_seconds += time.perf_counter() - start
+
+    scanned = [
+        page
+        for page in range(1, page_count + 1)
+        if sum(len(text) for text in pages.get(page, [])) < settings.PDF_MIN_PAGE_CHARS
+    ]
+    stats.fast_pages += page_count - len(scanned)
+    stats.fast_chars += sum(len(text) for page in pages.values() for text in page)
+
+    if not scanned or not settings.PDF_OCR_ENABLED:
+        stats.empty_pages += len(scanned)
+        return pages
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=min(settings.PDF_OCR_WORKERS, len(scanned))) as pool:
+        futures = {page: pool.submit(_ocr_page, file_path, page) for page in scanned}
+        for page, future in futures.items():
+            try:
+                text = future.result()
+            except Exception as e:
+                print(f"  ✗ OCR failed on page {page}: {e}")
+                stats.ocr_failed_pages += 1
+                continue
+
+            if text.strip():
+                # OCR output replaces whatever scraps the fast pass found
+                pages[page] = [text]
+                stats.ocr_pages += 1
+                stats.ocr_chars += len(text)
+            else:
+                stats.empty_pages += 1
+    stats.ocr_seconds += time.perf_counter() - start
+
+    return pages
+
+
+def load_pdf(file_path: str, stats: ExtractionStats | None = None) -> List[Document]:
+    """
+    Load a PDF file and extract text content.
+
+    Text-based pages use the fast parser; pages without a text layer (scans)
+    are OCR'd individually.
+
+    Args:
+        file_path: Path to the PDF file
+        stats: Accumulates per-strategy coverage and timing, if given
+
+    Returns:
+        List of Document objects with extracted content
+    """
+    file_name = Path(file_path).name
+    file_stats = ExtractionStats()
+    pages = _extract_pages(file_path, file_stats)
+    if stats is not None:
+        stats.add(file_stats)
+
     # Group elements into documents
     documents = []
     current_text = []
 
-    for element in elements:
-        text = str(element)
-        if text.strip():
+    for page in sorted(pages):
+        for text in pages[page]:
             current_text.append(text)
 
-        # Create a new document every ~1000 characters or at section breaks
-        if len("\n".join(current_text)) > 1000:
-            documents.append(
-                Document(
-                    page_content="\n".join(current_text),
-                    metadata={"source": file_name, "type": "pdf"},
+            # Create a new document every ~1000 characters or at section breaks
+            if len("\n".join(current_text)) > 1000:
+                documents.append(
+                    Document(
+                        page_content="\n".join(current_text),
+                        metadata={"source": file_name, "type": "pdf"},
+                    )
                 )
-            )
-            current_text = []
+                current_text = []
 
     # Add remaining content
     if current_text:
@@ -69,6 +194,7 @@ def load_all_pdfs(pdf_dir: str) -> List[Document]:
     """
     all_documents = []
     pdf_path = Path(pdf_dir)
+    stats = ExtractionStats()
 
 
     for pdf_file in sorted(pdf_path.glob("*.pdf")):
@@ -76,10 +202,12 @@ def load_all_pdfs(pdf_dir: str) -> List[Document]:
         print(f"Processing: {pdf_file.name}")
 
         try:
-            docs = load_pdf(str(pdf_file))
+            docs = load_pdf(str(pdf_file), stats)
             all_documents.extend(docs)
             print(f"  ✓ Extracted {len(docs)} documents")
         except Exception as e:
             print(f"  ✗ Error processing {pdf_file.name}: {e}")
 
+    print(f"Extraction stats: {stats.as_dict()}")
+
     return all_documents
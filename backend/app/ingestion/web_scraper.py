@@ -1,24 +1,22 @@
 from typing import List
 
-import httpx
 from bs4 import BeautifulSoup
 from langchain_core.documents import Document
 
 
-async def scrape_aram_history() -> List[Document]:
+def html_to_documents(html: str, url: str) -> List[Document]:
     """
-    Scrape the ARAM Brazil coffee history page.
+    Extract the readable text of an HTML page.
+
+    Args:
+        html: Page HTML
+        url: Page URL, stored as the document source
 
     Returns:
         List of Document objects with scraped content
     """
-    url = "https://arambrasil.coffee/historia/"
-
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, follow_redirects=True)
-        response.raise_for_status()
-
-    soup = BeautifulSoup(response.text, "html.parser")
+    soup = BeautifulSoup(html, "html.parser")
+    title = soup.title.get_text(strip=True) if soup.title else url
 
     # Remove script and style elements
     for element in soup(["script", "style", "nav", "footer", "header"]):
@@ -53,7 +51,7 @@ async def scrape_aram_history() -> List[Document]:
                     metadata={
                         "source": url,
                         "type": "web",
-                        "title": "ARAM Brasil - História do Café",
+                        "title": title,
                     },
                 )
             )
@@ -68,16 +66,9 @@ async def scrape_aram_history() -> List[Document]:
                 metadata={
                     "source": url,
                     "type": "web",
-                    "title": "ARAM Brasil - História do Café",
+                    "title": title,
                 },
             )
         )
 
     return documents
-
-
-def scrape_aram_history_sync() -> List[Document]:
-    """Synchronous wrapper for scraping ARAM history."""
-    import asyncio
-
-    return asyncio.run(scrape_aram_history())
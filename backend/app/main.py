@@ -1,15 +1,27 @@
+import asyncio
+import json
 import logging
 from contextlib import asynccontextmanager
 from uuid import UUID
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from sse_starlette.sse import EventSourceResponse
 
+from app.admission import AdmissionTimeout, admission
 from app.agents.coffee_agent import chat, chat_simple
-from app.db.session_manager import get_session_history
-from app.settings import get_cors_origins
+from app.agents.router import router_report
+from app.batch import BatchRequest, run_batch
+from app.db.history_cache import history_cache
+from app.db.retention import maintenance_loop
+from app.db.session_manager import delete_session_summary, get_session_history
+from app.metrics import metrics
+from app.settings import get_cors_origins, settings
+from app.tools.speculation import speculation_report
+from app.tracing import configure_langsmith, tracer
+from app.warmup import readiness, warmup
 
 # Configure logging
 logging.basicConfig(
@@ -18,22 +30,26 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# LangSmith's full export only runs when LANGSMITH_TRACING is set; sampled tracing is built in
+configure_langsmith()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler."""
     logger.info("🌱 Brazilian Coffee Chatbot starting up...")
-    
-    # Initialize database tables
-    try:
-        from app.db.session_manager import _ensure_table_exists
-        _ensure_table_exists()
-        logger.info("✅ Database tables initialized")
-    except Exception as e:
-        logger.error(f"Failed to initialize database tables: {e}")
-    
+
+    # Warm pools, vector store and agent in the background; /ready reports progress
+    warmup_task = asyncio.create_task(warmup())
+
+    # Chat history partitions and retention, once warmup has opened the pool
+    maintenance_task = asyncio.create_task(maintenance_loop(after=warmup_task))
+
     yield
     logger.info("☕ Shutting down...")
+    warmup_task.cancel()
+    maintenance_task.cancel()
+    tracer.exporter.shutdown()
 
 
 app = FastAPI(
@@ -79,6 +95,27 @@ async def root():
     return {"status": "healthy", "service": "Brazilian Coffee Chatbot"}
 
 
+@app.get("/ready")
+async def ready():
+    """Readiness check endpoint. Returns 503 until startup warmup has finished."""
+    status = readiness.snapshot()
+    if not readiness.ready:
+        return JSONResponse(status_code=503, content=status)
+    return status
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """In-process metrics for this worker."""
+    return {
+        **metrics.snapshot(),
+        "admission": admission.snapshot(),
+        "history_cache": history_cache.snapshot(),
+        "router": router_report(),
+        "speculation": speculation_report(),
+    }
+
+
 @app.get("/sessions/{session_id}/messages")
 async def get_session_messages_endpoint(session_id: UUID):
     """Get messages for a session from the database."""
@@ -116,8 +153,11 @@ async def chat_endpoint(request: ChatRequest):
         Complete response
     """
     try:
-        response = await chat_simple(request.message, str(request.session_id))
+        async with admission.slot(timeout=settings.CHAT_QUEUE_TIMEOUT):
+            response = await chat_simple(request.message, str(request.session_id))
         return ChatResponse(response=response)
+    except AdmissionTimeout:
+        raise HTTPException(status_code=503, detail="Server busy, try again shortly")
     except Exception as e:
         logger.error(f"Chat error for session {request.session_id}: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to process chat request")
@@ -136,9 +176,12 @@ async def chat_stream_endpoint(request: ChatRequest):
     """
     async def generate():
         try:
-            async for chunk in chat(request.message, str(request.session_id)):
-                yield {"event": "message", "data": chunk}
+            async with admission.slot(timeout=settings.CHAT_QUEUE_TIMEOUT):
+                async for chunk in chat(request.message, str(request.session_id)):
+                    yield {"event": "message", "data": chunk}
             yield {"event": "done", "data": ""}
+        except AdmissionTimeout:
+            yield {"event": "error", "data": "Server busy, try again shortly"}
         except Exception as e:
             logger.error(f"Stream error for session {request.session_id}: {str(e)}", exc_info=True)
             yield {"event": "error", "data": str(e)}
@@ -146,6 +189,28 @@ async def chat_stream_endpoint(request: ChatRequest):
     return EventSourceResponse(generate())
 
 
+@app.post("/chat/batch")
+async def chat_batch_endpoint(request: BatchRequest):
+    """
+    Batch chat endpoint for evaluation sets and bulk workloads.
+
+    Items run with bounded concurrency under the batch share of the admission
+    limits; messages of the same session run in order.
+
+    Args:
+        request: Items (message, session_id, optional id) and requested concurrency
+
+    Returns:
+        NDJSON stream with one result per item (response, latency, route and
+        tools used) as it completes, then a summary line
+    """
+    async def generate():
+        async for result in run_batch(request.items, request.concurrency):
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
 @app.delete("/sessions/{session_id}")
 async def delete_session_messages(session_id: UUID):
     """
@@ -159,8 +224,9 @@ async def delete_session_messages(session_id: UUID):
     """
     try:
         with get_session_history(str(session_id)) as history:
-            history.clear()  # Executes DELETE FROM chat_history WHERE session_id = ?
-            logger.info(f"Cleared session {session_id}")
+            history.clear()  # DELETE FROM chat_history WHERE session_id = ?, and drops the cached window
+        delete_session_summary(str(session_id))
+        logger.info(f"Cleared session {session_id}")
         return {"status": "cleared"}
     except Exception as e:
         logger.error(f"Failed to clear session {session_id}: {str(e)}", exc_info=True)
@@ -0,0 +1,87 @@
+import threading
+from collections import defaultdict
+
+
+def percentile(values: list[float], percent: float) -> float | None:
+    """
+    Percentile of a sample, interpolating between closest ranks.
+
+    Matches statistics.quantiles(method="inclusive") but takes any percent
+    and copes with fewer than two values.
+
+    Args:
+        values: Samples, in any order
+        percent: 0-100
+
+    Returns:
+        The percentile, or None for an empty sample
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class Metrics:
+    """
+    Minimal in-process metrics registry.
+
+    Counters and timings are kept per worker process and exposed through
+    GET /metrics. Safe to update from the event loop and from tool threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = defaultdict(float)
+        self._timings: dict[str, list[float]] = defaultdict(lambda: [0, 0.0])
+
+    def increment(self, name: str, value: float = 1) -> None:
+        """Add value to a counter."""
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Record one duration sample for a timing."""
+        with self._lock:
+            timing = self._timings[name]
+            timing[0] += 1
+            timing[1] += seconds
+
+    def counter(self, name: str) -> float:
+        """Get the current value of a counter."""
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def mean(self, name: str) -> float | None:
+        """Get the mean duration of a timing, or None if it has no samples."""
+        with self._lock:
+            count, total = self._timings.get(name, (0, 0.0))
+        return total / count if count else None
+
+    def total(self, name: str) -> float:
+        """Get the sum of all samples of a timing."""
+        with self._lock:
+            return self._timings.get(name, (0, 0.0))[1]
+
+    def snapshot(self) -> dict:
+        """Return a JSON-serializable view of all counters and timings."""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "timings": {
+                    name: {"count": count, "total_seconds": round(total, 6)}
+                    for name, (count, total) in self._timings.items()
+                },
+            }
+
+    def reset(self) -> None:
+        """Clear all counters and timings."""
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+
+
+metrics = Metrics()
@@ -1,6 +1,7 @@
 import json
 import os
 
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -41,11 +42,73 @@ class Settings(BaseSettings):
     # Google Places
     GPLACES_API_KEY: str | None = None
 
-    # LangSmith
-    LANGSMITH_TRACING: bool = True
+    # LangSmith (full export of every run; off by default, see Tracing below)
+    LANGSMITH_TRACING: bool = False
     LANGSMITH_ENDPOINT: str = "https://api.smith.langchain.com"
     LANGSMITH_API_KEY: str | None = None
     LANGSMITH_PROJECT: str = "Brazilian Coffee"
 
+    # Tracing (built-in and sampled: errored/slow turns plus a share of the rest)
+    TRACING_ENABLED: bool = True
+    TRACE_SAMPLE_RATE: float = 0.01  # Head sampling: share of ordinary turns kept
+    TRACE_SLOW_SECONDS: float = 15.0  # Tail sampling: slower turns are always kept
+    TRACE_JSONL_PATH: str | None = None  # Also append kept traces to this file
+    TRACE_EXPORT_BATCH_SIZE: int = 50
+    TRACE_EXPORT_INTERVAL: float = 5.0  # Seconds between exporter flushes
+    TRACE_QUEUE_SIZE: int = 1000  # Kept traces waiting for export; more are dropped
+
+    # Startup warmup
+    WARMUP_ENABLED: bool = True
+    WARMUP_STUB_RETRIEVAL: bool = False  # Embeds one query, costs an API call
+    WARMUP_RETRY_SECONDS: float = 5.0
+
+    # Pre-router (answers greetings, off-topic and coffee-shop lookups without the LLM)
+    ROUTER_ENABLED: bool = True
+
+    # Speculative retrieval (knowledge-base search runs alongside the first LLM call)
+    SPECULATIVE_RETRIEVAL: bool = False
+    SPECULATION_MIN_OVERLAP: float = 0.5
+
+    # Conversation history (running summary + recent window)
+    HISTORY_RECENT_MESSAGES: int = 4
+    HISTORY_TOKEN_BUDGET: int = 3000
+    SUMMARY_ENABLED: bool = True
+    SUMMARY_MODEL: str = "gemini-2.5-flash"
+    SUMMARY_MAX_WORDS: int = 200
+    SUMMARY_MIN_NEW_MESSAGES: int = 2
+
+    # Chat history storage (monthly partitions, retention, optional per-worker cache of recent messages)
+    HISTORY_RETENTION_DAYS: int = 0  # Drop months older than this; 0 keeps history forever
+    HISTORY_PARTITIONS_AHEAD: int = 2  # Future months created in advance
+    HISTORY_MAINTENANCE_HOURS: float = 24.0
+    HISTORY_CACHE_SESSIONS: int = 0  # Off by default; only enable with sticky sessions (see README)
+    HISTORY_CACHE_MESSAGES: int = 20  # Recent messages cached per session
+    HISTORY_CACHE_TTL: float = 300.0  # Seconds; bounds staleness when turns hit other workers
+
+    # Admission control (concurrent chat turns per worker; batch jobs get a capped share)
+    CHAT_MAX_CONCURRENCY: int = Field(default=16, ge=2)  # Batch turns always leave one slot free
+    CHAT_QUEUE_TIMEOUT: float = 30.0  # Seconds a request may wait for a slot before a 503
+    BATCH_MAX_CONCURRENCY: int = Field(default=4, ge=1)  # Capped at CHAT_MAX_CONCURRENCY - 1
+    BATCH_MAX_ITEMS: int = 500
+
+    # Ingestion: web crawler (lists accept JSON, e.g. CRAWL_SEEDS='["https://..."]')
+    CRAWL_SEEDS: list[str] = ["https://arambrasil.coffee/historia/"]
+    CRAWL_SITEMAPS: list[str] = []
+    CRAWL_URL_PATTERN: str | None = None  # Regex that sitemap URLs must match
+    CRAWL_MAX_PAGES: int = 500
+    CRAWL_MAX_CONCURRENCY: int = 8
+    CRAWL_PER_HOST_CONCURRENCY: int = 2
+    CRAWL_PER_HOST_DELAY: float = 1.0  # Seconds between requests to the same host
+    CRAWL_CACHE_PATH: str = ".ingestion/crawl_cache.json"
+
+    # Ingestion: PDF extraction (pages without a text layer are OCR'd individually)
+    PDF_OCR_ENABLED: bool = True
+    PDF_OCR_WORKERS: int = 4
+    PDF_OCR_DPI: int = 200
+    PDF_MIN_PAGE_CHARS: int = 20  # Pages with less text than this count as scanned
+
+    # Ingestion: checkpointed runs (progress, parsed sources, chunks, reports)
+    INGESTION_RUNS_DIR: str = ".ingestion/runs"
+
 
 settings = Settings()
@@ -0,0 +1,118 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Hashable
+
+from app.metrics import metrics
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls into a single in-flight call.
+
+    The first caller for a key (the leader) runs the call; callers that arrive
+    with the same key while it is still running wait for the leader's outcome
+    instead of calling upstream again. Results and exceptions are shared with
+    every waiter. Nothing is cached once the call finishes.
+
+    Usage:
+        _places = SingleFlight("places")
+        result = _places.do(location, search, location)
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, Future] = {}
+        self._flights: dict[Hashable, _AsyncFlight] = {}
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run fn(*args, **kwargs), or wait for an identical call already in flight.
+
+        Safe to call from multiple threads (tools run in worker threads).
+
+        Args:
+            key: Identifies identical calls
+            fn: The upstream call
+
+        Returns:
+            The result of the (possibly shared) call
+
+        Raises:
+            Exception: Whatever the shared call raised
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        metrics.increment(f"singleflight.{self.name}.calls")
+        if not leader:
+            metrics.increment(f"singleflight.{self.name}.coalesced")
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Async variant of do() for callers on the event loop.
+
+        The shared call runs as its own task. A waiter that is cancelled stops
+        waiting without affecting the others; the upstream call is cancelled
+        only when every waiter has gone.
+
+        Args:
+            key: Identifies identical calls
+            fn: Returns the upstream awaitable
+
+        Returns:
+            The result of the (possibly shared) call
+        """
+        flight = self._flights.get(key)
+        metrics.increment(f"singleflight.{self.name}.calls")
+        # A call abandoned by all its waiters may still be winding down; don't join it
+        if flight is None or flight.abandoned:
+            flight = _AsyncFlight(task=asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+        else:
+            metrics.increment(f"singleflight.{self.name}.coalesced")
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.abandoned = True
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _forget(self, key: Hashable, flight: "_AsyncFlight") -> None:
+        """Unregister a finished call unless a newer one already replaced it."""
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+
+@dataclass
+class _AsyncFlight:
+    """An in-flight async call and how many callers are waiting on it."""
+
+    task: asyncio.Task
+    waiters: int = 0
+    abandoned: bool = False
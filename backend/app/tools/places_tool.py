@@ -2,9 +2,69 @@ import httpx
 from langchain_core.tools import tool
 
 from app.settings import settings
+from app.singleflight import SingleFlight
 
 PLACES_API_URL = "https://maps.googleapis.com/maps/api/place/textsearch/json"
 
+_searches = SingleFlight("places")
+
+
+def search_coffee_shops(location: str, limit: int = 10) -> list[dict]:
+    """
+    Query Google Places for coffee shops in a location.
+    Concurrent searches for the same location share one API request.
+
+    Args:
+        location: The city or location to search for coffee shops
+        limit: Maximum number of places to return
+
+    Returns:
+        Raw place results (empty if nothing was found)
+
+    Raises:
+        httpx.HTTPError: If the Places API request fails
+    """
+    results = _searches.do(location.strip().casefold(), _fetch_coffee_shops, location)
+    return results[:limit]
+
+
+def _fetch_coffee_shops(location: str) -> list[dict]:
+    """Call the Places Text Search API."""
+    response = httpx.get(
+        PLACES_API_URL,
+        params={
+            "query": f"coffee shop in {location}",
+            "key": settings.GPLACES_API_KEY,
+            "language": "pt-BR",
+        },
+        timeout=10.0,
+    )
+    response.raise_for_status()
+    data = response.json()
+
+    if data.get("status") != "OK":
+        return []
+
+    return data.get("results", [])
+
+
+def format_coffee_shops(places: list[dict]) -> str:
+    """Format Places results as Markdown."""
+    formatted = []
+    for place in places:
+        name = place.get("name", "Unknown")
+        address = place.get("formatted_address", "Address not available")
+        rating = place.get("rating", "N/A")
+        total_ratings = place.get("user_ratings_total", 0)
+        
+        formatted.append(
+            f"**{name}**\n"
+            f"📍 {address}\n"
+            f"⭐ {rating}/5 ({total_ratings} reviews)"
+        )
+
+    return "\n\n---\n\n".join(formatted)
+
 
 @tool
 def find_coffee_shops(location: str) -> str:
@@ -23,41 +83,12 @@ def find_coffee_shops(location: str) -> str:
         return "Google Places API key not configured. Cannot search for coffee shops."
 
     try:
-        response = httpx.get(
-            PLACES_API_URL,
-            params={
-                "query": f"coffee shop in {location}",
-                "key": settings.GPLACES_API_KEY,
-                "language": "pt-BR",
-            },
-            timeout=10.0,
-        )
-        response.raise_for_status()
-        data = response.json()
-
-        if data.get("status") != "OK":
-            return f"No coffee shops found in {location}."
-
-        results = data.get("results", [])[:10]
+        results = search_coffee_shops(location)
 
         if not results:
             return f"No coffee shops found in {location}."
 
-        # Format results
-        formatted = []
-        for place in results:
-            name = place.get("name", "Unknown")
-            address = place.get("formatted_address", "Address not available")
-            rating = place.get("rating", "N/A")
-            total_ratings = place.get("user_ratings_total", 0)
-            
-            formatted.append(
-                f"**{name}**\n"
-                f"📍 {address}\n"
-                f"⭐ {rating}/5 ({total_ratings} reviews)"
-            )
-
-        return "\n\n---\n\n".join(formatted)
+        return format_coffee_shops(results)
 
     except httpx.TimeoutException:
         return "Request timed out. Please try again."
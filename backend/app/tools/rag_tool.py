@@ -1,6 +1,34 @@
+from langchain_core.documents import Document
 from langchain_core.tools import tool
 
 from app.db.vector_store import get_retriever
+from app.singleflight import SingleFlight
+from app.tools.speculation import take_speculation
+
+KNOWLEDGE_TOP_K = 5
+
+_retrievals = SingleFlight("retriever")
+
+
+def retrieve_documents(query: str, k: int = KNOWLEDGE_TOP_K) -> list[Document]:
+    """Run a similarity search against the knowledge base, sharing identical in-flight searches."""
+    retriever = get_retriever(k=k)
+    return _retrievals.do((query.strip(), k), retriever.invoke, query)
+
+
+def format_documents(docs: list[Document]) -> str:
+    """Format retrieved documents for the agent."""
+    if not docs:
+        return "No relevant information found in the knowledge base."
+
+    # Format results
+    results = []
+    for i, doc in enumerate(docs, 1):
+        source = doc.metadata.get("source", "Unknown")
+        content = doc.page_content[:500]  # Limit content length
+        results.append(f"[Source {i}: {source}]\n{content}")
+
+    return "\n\n---\n\n".join(results)
 
 
 @tool
@@ -21,17 +49,9 @@ def search_coffee_knowledge(query: str) -> str:
     Returns:
         Relevant information from the knowledge base
     """
-    retriever = get_retriever(k=5)
-    docs = retriever.invoke(query)
-
-    if not docs:
-        return "No relevant information found in the knowledge base."
-
-    # Format results
-    results = []
-    for i, doc in enumerate(docs, 1):
-        source = doc.metadata.get("source", "Unknown")
-        content = doc.page_content[:500]  # Limit content length
-        results.append(f"[Source {i}: {source}]\n{content}")
+    # Reuse the retrieval started alongside the first LLM call, if it matches
+    docs = take_speculation(query)
+    if docs is None:
+        docs = retrieve_documents(query)
 
-    return "\n\n---\n\n".join(results)
+    return format_documents(docs)
@@ -1,7 +1,21 @@
 from langchain_core.tools import tool
-from tavily import TavilyClient
 
 from app.settings import settings
+from app.singleflight import SingleFlight
+
+_searches = SingleFlight("tavily")
+
+
+def _tavily_search(query: str) -> dict:
+    """Call the Tavily search API."""
+    from tavily import TavilyClient
+
+    client = TavilyClient(api_key=settings.TAVILY_API_KEY)
+    return client.search(
+        query=f"{query} Brazilian coffee",
+        search_depth="basic",
+        max_results=5,
+    )
 
 
 @tool
@@ -22,14 +36,9 @@ def search_web(query: str) -> str:
     if not settings.TAVILY_API_KEY:
         return "Tavily API key not configured. Cannot perform web search."
 
-    client = TavilyClient(api_key=settings.TAVILY_API_KEY)
-
     try:
-        response = client.search(
-            query=f"{query} Brazilian coffee",
-            search_depth="basic",
-            max_results=5,
-        )
+        # Concurrent identical searches share one Tavily request
+        response = _searches.do(query.strip().casefold(), _tavily_search, query)
 
         if not response.get("results"):
             return "No results found on the web."
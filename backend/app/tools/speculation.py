@@ -0,0 +1,130 @@
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from app.agents.router import content_tokens
+from app.metrics import metrics
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="speculative-retrieval")
+
+
+@dataclass
+class SpeculativeRetrieval:
+    """A knowledge-base retrieval started before the model asked for it."""
+
+    query: str
+    future: Future | None = None
+    started_at: float = field(default_factory=time.perf_counter)
+    finished_at: float | None = None
+    consumed: bool = False
+
+    def matches(self, query: str) -> bool:
+        """
+        Whether the model's tool query asks for the same thing as the prefetch.
+
+        The model usually rephrases the user's question, so this compares
+        content words (overlap coefficient) rather than exact strings.
+        """
+        ours, theirs = content_tokens(self.query), content_tokens(query)
+        if not ours or not theirs:
+            return False
+        overlap = len(ours & theirs) / min(len(ours), len(theirs))
+        return overlap >= settings.SPECULATION_MIN_OVERLAP
+
+
+# Set by chat() for the duration of a turn; copied into the tool's worker thread
+_current: ContextVar[SpeculativeRetrieval | None] = ContextVar("speculative_retrieval", default=None)
+
+
+def start_speculation(query: str, fetch: Callable[[], Any]) -> SpeculativeRetrieval:
+    """
+    Start a retrieval in the background and make it available to the current turn.
+
+    Args:
+        query: The text being retrieved for (the user's message)
+        fetch: Performs the retrieval
+
+    Returns:
+        The running speculation
+    """
+    speculation = SpeculativeRetrieval(query=query)
+
+    def run():
+        try:
+            return fetch()
+        finally:
+            speculation.finished_at = time.perf_counter()
+
+    speculation.future = _executor.submit(run)
+    _current.set(speculation)
+    metrics.increment("speculation.started")
+    return speculation
+
+
+def take_speculation(query: str) -> Any | None:
+    """
+    Claim the prefetched result for a tool call, if it matches the query.
+
+    Args:
+        query: The query the model passed to the tool
+
+    Returns:
+        The prefetched result, or None if the tool should retrieve normally
+    """
+    speculation = _current.get()
+    if speculation is None or speculation.consumed:
+        return None
+
+    if not speculation.matches(query):
+        metrics.increment("speculation.miss")
+        return None
+
+    speculation.consumed = True
+    requested_at = time.perf_counter()
+    try:
+        result = speculation.future.result()
+    except Exception as e:
+        logger.warning(f"Speculative retrieval failed, retrieving again: {e}")
+        metrics.increment("speculation.error")
+        return None
+
+    # Time the tool would have spent retrieving minus the time it actually waited
+    duration = speculation.finished_at - speculation.started_at
+    waited = max(speculation.finished_at - requested_at, 0.0)
+    metrics.increment("speculation.hit")
+    metrics.observe("speculation.saved", duration - waited)
+    return result
+
+
+def finish_speculation() -> None:
+    """End the current turn's speculation, discarding an unclaimed result."""
+    speculation = _current.get()
+    if speculation is None:
+        return
+
+    if not speculation.consumed:
+        speculation.future.cancel()
+        metrics.increment("speculation.unused")
+    _current.set(None)
+
+
+def speculation_report() -> dict:
+    """Summarize how often speculative retrieval paid off."""
+    started = metrics.counter("speculation.started")
+    hits = metrics.counter("speculation.hit")
+
+    return {
+        "started": int(started),
+        "hits": int(hits),
+        "misses": int(metrics.counter("speculation.miss")),
+        "unused": int(metrics.counter("speculation.unused")),
+        "hit_rate": round(hits / started, 4) if started else 0.0,
+        "mean_latency_saved_seconds": metrics.mean("speculation.saved"),
+        "total_latency_saved_seconds": round(metrics.total("speculation.saved"), 6),
+    }
@@ -0,0 +1,352 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from app.metrics import metrics
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Span:
+    """One timed step of a trace."""
+
+    name: str
+    span_id: str
+    parent_id: str | None
+    start: float  # Unix time
+    duration_ms: float | None = None
+    status: str = "ok"
+    error: str | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    _perf_start: float = field(default_factory=time.perf_counter, repr=False)
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def end(self, error: BaseException | None = None) -> None:
+        self.duration_ms = round((time.perf_counter() - self._perf_start) * 1000, 3)
+        if error is not None:
+            self.status = "error"
+            self.error = f"{type(error).__name__}: {error}"
+
+
+class Trace:
+    """
+    Spans of one chat turn, recorded in memory.
+
+    Every turn is recorded; whether it is exported is decided when it ends
+    (see Tracer.end_trace). Spans may be added from tool threads.
+    """
+
+    enabled = True
+
+    def __init__(self, name: str, head_sampled: bool, **attributes):
+        self.trace_id = uuid.uuid4().hex
+        self.head_sampled = head_sampled
+        self.root = Span(name, uuid.uuid4().hex[:16], None, time.time(), attributes=attributes)
+        self.spans: list[Span] = []
+
+    def start_span(self, name: str, parent_id: str | None = None, **attributes) -> Span:
+        """Start a child span (of the root unless parent_id is given)."""
+        span = Span(name, uuid.uuid4().hex[:16], parent_id or self.root.span_id, time.time(), attributes=attributes)
+        self.spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Time a block as a child span of the root."""
+        span = self.start_span(name, **attributes)
+        try:
+            yield span
+        except BaseException as e:
+            span.end(e)
+            raise
+        span.end()
+
+    def set(self, **attributes) -> None:
+        """Add attributes to the root span."""
+        self.root.set(**attributes)
+
+    def callbacks(self, parent: Span | None = None) -> list[BaseCallbackHandler]:
+        """LangChain callbacks that record LLM and tool runs as spans under parent."""
+        return [TracingCallbackHandler(self, parent.span_id if parent else None)]
+
+    def to_record(self, kept_by: str) -> dict:
+        def span_dict(span: Span) -> dict:
+            return {key: value for key, value in asdict(span).items() if not key.startswith("_")}
+
+        return {
+            "trace_id": self.trace_id,
+            "kept_by": kept_by,
+            **span_dict(self.root),
+            "spans": [span_dict(span) for span in self.spans],
+        }
+
+
+class _NoopSpan:
+    def set(self, **attributes) -> None:
+        pass
+
+    def end(self, error: BaseException | None = None) -> None:
+        pass
+
+
+class _NoopTrace:
+    """Stands in for Trace when tracing is disabled, so callers never branch."""
+
+    enabled = False
+
+    def start_span(self, name: str, parent_id: str | None = None, **attributes) -> _NoopSpan:
+        return _NoopSpan()
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        yield _NoopSpan()
+
+    def set(self, **attributes) -> None:
+        pass
+
+    def callbacks(self, parent: Any = None) -> list[BaseCallbackHandler]:
+        return []
+
+
+NOOP_TRACE = _NoopTrace()
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Records chat model calls (with token usage) and tool calls as spans."""
+
+    run_inline = True  # Don't hop to an executor thread for every event
+
+    def __init__(self, trace: Trace, parent_id: str | None):
+        self.trace = trace
+        self.parent_id = parent_id
+        self._spans: dict[uuid.UUID, Span] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs) -> None:
+        model = (kwargs.get("metadata") or {}).get("ls_model_name")
+        self._spans[run_id] = self.trace.start_span("llm", self.parent_id, model=model)
+
+    def on_llm_end(self, response, *, run_id, **kwargs) -> None:
+        span = self._spans.pop(run_id, None)
+        if span is None:
+            return
+        message = getattr(response.generations[0][0], "message", None) if response.generations else None
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            span.set(input_tokens=usage.get("input_tokens"), output_tokens=usage.get("output_tokens"))
+        if message is not None and getattr(message, "tool_calls", None):
+            span.set(tool_calls=[call["name"] for call in message.tool_calls])
+        span.end()
+
+    def on_llm_error(self, error, *, run_id, **kwargs) -> None:
+        span = self._spans.pop(run_id, None)
+        if span is not None:
+            span.end(error)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs) -> None:
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        self._spans[run_id] = self.trace.start_span(f"tool.{name}", self.parent_id)
+
+    def on_tool_end(self, output, *, run_id, **kwargs) -> None:
+        span = self._spans.pop(run_id, None)
+        if span is not None:
+            span.end()
+
+    def on_tool_error(self, error, *, run_id, **kwargs) -> None:
+        span = self._spans.pop(run_id, None)
+        if span is not None:
+            span.end(error)
+
+
+class JsonlSink:
+    """Appends kept traces to a local JSONL file."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+
+    def __call__(self, batch: list[dict]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as file:
+            for record in batch:
+                file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+
+def log_sink(batch: list[dict]) -> None:
+    """Logs one line per kept trace."""
+    for record in batch:
+        logger.info(
+            f"trace {record['trace_id']} {record['name']} {record['duration_ms']:.0f}ms "
+            f"status={record['status']} kept_by={record['kept_by']} spans={len(record['spans'])}"
+        )
+
+
+class BatchExporter:
+    """
+    Ships kept traces to the sinks from a background thread, in batches.
+
+    Request handlers only enqueue; if the queue is full the trace is dropped
+    (counted in tracing.dropped) rather than slowing the request down.
+    """
+
+    def __init__(self, sinks: list[Callable[[list[dict]], None]], batch_size: int, interval: float, max_queue: int):
+        self.sinks = sinks
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue: queue.Queue[dict] = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def submit(self, record: dict) -> None:
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            metrics.increment("tracing.dropped")
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+                atexit.register(self.shutdown)
+
+    def _run(self) -> None:
+        batch: list[dict] = []
+        deadline = time.monotonic() + self.interval
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0.01)))
+            except queue.Empty:
+                pass
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline or self._stop.is_set():
+                self._write(batch)
+                batch = []
+                deadline = time.monotonic() + self.interval
+        self._write(batch)
+
+    def _write(self, batch: list[dict]) -> None:
+        if not batch:
+            return
+        for sink in self.sinks:
+            try:
+                sink(batch)
+            except Exception as e:
+                logger.warning(f"Trace sink {sink} failed: {e}")
+        metrics.increment("tracing.exported", len(batch))
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Flush queued traces and stop the exporter thread."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+
+
+class Tracer:
+    """
+    Sampled, in-process tracing of chat turns.
+
+    Head sampling keeps a random TRACE_SAMPLE_RATE share of turns; tail
+    sampling always keeps turns that failed or took longer than
+    TRACE_SLOW_SECONDS. Everything else is discarded when the turn ends.
+    """
+
+    def __init__(self, enabled: bool, sample_rate: float, slow_seconds: float, exporter: BatchExporter):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+        self.exporter = exporter
+
+    def start_trace(self, name: str, **attributes) -> Trace | _NoopTrace:
+        """Start recording a turn."""
+        if not self.enabled:
+            return NOOP_TRACE
+        return Trace(name, random.random() < self.sample_rate, **attributes)
+
+    def end_trace(self, trace: Trace | _NoopTrace, error: BaseException | None = None) -> None:
+        """Finish a turn and hand it to the exporter if it is sampled."""
+        if not trace.enabled:
+            return
+
+        trace.root.end(error)
+        # Spans left open by a failure or an abandoned stream end with the turn
+        for span in trace.spans:
+            if span.duration_ms is None:
+                span.end(error)
+
+        metrics.increment("tracing.traces")
+        if trace.root.status == "error":
+            kept_by = "error"
+        elif trace.root.duration_ms >= self.slow_seconds * 1000:
+            kept_by = "slow"
+        elif trace.head_sampled:
+            kept_by = "head"
+        else:
+            return
+
+        metrics.increment(f"tracing.kept.{kept_by}")
+        self.exporter.submit(trace.to_record(kept_by))
+
+    @contextmanager
+    def trace(self, name: str, **attributes):
+        """Record a block as a trace."""
+        trace = self.start_trace(name, **attributes)
+        try:
+            yield trace
+        except BaseException as e:
+            self.end_trace(trace, e)
+            raise
+        self.end_trace(trace)
+
+
+def configure_langsmith() -> None:
+    """
+    Make settings.LANGSMITH_TRACING authoritative for LangChain's LangSmith tracer.
+
+    LangChain reads the process environment, so without this an exported
+    LANGSMITH_TRACING / LANGCHAIN_TRACING_V2 would turn full trace export on
+    regardless of the setting.
+    """
+    flag = "true" if settings.LANGSMITH_TRACING else "false"
+    os.environ["LANGSMITH_TRACING"] = flag
+    os.environ["LANGSMITH_TRACING_V2"] = flag
+    if settings.LANGSMITH_TRACING:
+        os.environ["LANGSMITH_ENDPOINT"] = settings.LANGSMITH_ENDPOINT
+        os.environ["LANGSMITH_PROJECT"] = settings.LANGSMITH_PROJECT
+        if settings.LANGSMITH_API_KEY:
+            os.environ["LANGSMITH_API_KEY"] = settings.LANGSMITH_API_KEY
+
+
+def create_tracer() -> Tracer:
+    """Build the tracer from settings."""
+    sinks: list[Callable[[list[dict]], None]] = [log_sink]
+    if settings.TRACE_JSONL_PATH:
+        sinks.append(JsonlSink(settings.TRACE_JSONL_PATH))
+
+    exporter = BatchExporter(
+        sinks,
+        batch_size=settings.TRACE_EXPORT_BATCH_SIZE,
+        interval=settings.TRACE_EXPORT_INTERVAL,
+        max_queue=settings.TRACE_QUEUE_SIZE,
+    )
+    return Tracer(settings.TRACING_ENABLED, settings.TRACE_SAMPLE_RATE, settings.TRACE_SLOW_SECONDS, exporter)
+
+
+tracer = create_tracer()
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReadinessState:
+    """Outcome of the startup warmup, reported by the /ready endpoint."""
+
+    ready: bool = False
+    started_at: float | None = None
+    ready_at: float | None = None
+    checks: dict[str, dict] = field(default_factory=dict)
+
+    def snapshot(self) -> dict:
+        """Return a JSON-serializable view of the current state."""
+        warmup_seconds = None
+        if self.started_at is not None and self.ready_at is not None:
+            warmup_seconds = round(self.ready_at - self.started_at, 3)
+
+        return {
+            "status": "ready" if self.ready else "warming_up",
+            "warmup_seconds": warmup_seconds,
+            "checks": self.checks,
+        }
+
+
+readiness = ReadinessState()
+
+
+def _warm_database() -> None:
+    """Open the connection pool and make sure chat_history exists."""
+    from app.db.session_manager import _ensure_table_exists, get_connection_pool
+
+    get_connection_pool().wait(timeout=30.0)
+    _ensure_table_exists()
+
+
+def _warm_vector_store() -> None:
+    """Build the PGVector store, which creates its table metadata and collection."""
+    from app.db.vector_store import get_vector_store
+
+    get_vector_store()
+
+
+def _warm_agent() -> None:
+    """Import Gemini/LangGraph and compile the agent graph."""
+    from app.agents.coffee_agent import get_coffee_agent
+
+    get_coffee_agent()
+
+
+def _warm_retrieval() -> None:
+    """Run one throwaway similarity search end to end."""
+    from app.db.vector_store import get_retriever
+
+    get_retriever(k=1).invoke("café")
+
+
+def get_warmup_steps() -> list[tuple[str, Callable[[], None]]]:
+    """Get the warmup steps to run, in order."""
+    if not settings.WARMUP_ENABLED:
+        return []
+
+    steps = [
+        ("database", _warm_database),
+        ("vector_store", _warm_vector_store),
+        ("agent", _warm_agent),
+    ]
+    if settings.WARMUP_STUB_RETRIEVAL:
+        steps.append(("retrieval", _warm_retrieval))
+    return steps
+
+
+async def warmup() -> None:
+    """
+    Warm up the expensive dependencies before the first request needs them.
+
+    Each step runs in a worker thread so the event loop keeps serving the
+    health check meanwhile. Failed steps are retried until all of them pass,
+    at which point the app is marked ready.
+    """
+    readiness.started_at = time.perf_counter()
+    pending = get_warmup_steps()
+    for name, _ in pending:
+        readiness.checks[name] = {"status": "pending"}
+
+    while pending:
+        failed = []
+        for name, step in pending:
+            start = time.perf_counter()
+            try:
+                await asyncio.to_thread(step)
+            except Exception as e:
+                logger.warning(f"Warmup step '{name}' failed: {e}")
+                readiness.checks[name] = {"status": "failed", "error": str(e)}
+                failed.append((name, step))
+                continue
+
+            elapsed = time.perf_counter() - start
+            readiness.checks[name] = {"status": "ok", "seconds": round(elapsed, 3)}
+            logger.info(f"✅ Warmup step '{name}' done in {elapsed:.2f}s")
+
+        pending = failed
+        if pending:
+            await asyncio.sleep(settings.WARMUP_RETRY_SECONDS)
+
+    readiness.ready_at = time.perf_counter()
+    readiness.ready = True
+    logger.info(f"✅ Warm and ready in {readiness.ready_at - readiness.started_at:.2f}s")
@@ -4,5 +4,6 @@ CREATE EXTENSION IF NOT EXISTS vector;
 -- Note: The following tables will be created automatically:
 -- 1. langchain_pg_collection - by PGVector (collection metadata)
 -- 2. langchain_pg_embedding - by PGVector (documents and embeddings)
--- 3. chat_history - by PostgresChatMessageHistory (chat messages)
+-- 3. chat_history - by app.db.session_manager (chat messages, partitioned by month)
+-- 4. chat_summaries - by app.db.session_manager (running conversation summaries)
 -- All tables are created programmatically on first use
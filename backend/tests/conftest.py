@@ -0,0 +1,4 @@
+import os
+
+# Settings() requires a Google key at import time; tests never call Google
+os.environ.setdefault("GOOGLE_API_KEY", "test")
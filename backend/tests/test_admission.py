@@ -0,0 +1,41 @@
+import asyncio
+
+import pytest
+
+from app.admission import AdmissionController, AdmissionTimeout
+
+
+def test_limit_below_two_is_rejected():
+    with pytest.raises(ValueError):
+        AdmissionController(limit=1, batch_limit=1)
+
+
+def test_batch_limit_stays_below_the_global_limit():
+    assert AdmissionController(limit=2, batch_limit=4).batch_limit == 1
+    assert AdmissionController(limit=16, batch_limit=4).batch_limit == 4
+
+
+def test_batch_turns_leave_a_slot_for_interactive_turns():
+    asyncio.run(_batch_turns_leave_a_slot())
+
+
+async def _batch_turns_leave_a_slot():
+    controller = AdmissionController(limit=2, batch_limit=8)
+    release = asyncio.Event()
+
+    async def batch_turn():
+        async with controller.slot(batch=True):
+            await release.wait()
+
+    batch_turns = [asyncio.create_task(batch_turn()) for _ in range(3)]
+    await asyncio.sleep(0)
+
+    async with controller.slot(timeout=0.1):
+        assert controller.snapshot()["active"] == {"interactive": 1, "batch": 1}
+
+    with pytest.raises(AdmissionTimeout):
+        async with controller.slot(batch=True, timeout=0.01):
+            pass
+
+    release.set()
+    await asyncio.gather(*batch_turns)
@@ -0,0 +1,150 @@
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.ingestion.crawler import FetchCache, crawl_sync
+from app.settings import settings
+
+LAST_MODIFIED = "Wed, 01 Oct 2025 12:00:00 GMT"
+
+
+def page(text: str) -> bytes:
+    paragraphs = "".join(f"<p>{text} parágrafo {i} sobre a história do café no Brasil.</p>" for i in range(5))
+    return f"<html><head><title>Café</title></head><body><main>{paragraphs}</main></body></html>".encode()
+
+
+class StubSite:
+    """
+    Local site with two kinds of pages:
+
+    /validated/<name> sends an ETag and Last-Modified and honours conditional
+    requests; /plain/<name> sends no validators and always answers 200.
+    """
+
+    def __init__(self):
+        self.bodies: dict[str, bytes] = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.response_delay = 0.0
+        self._lock = threading.Lock()
+
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with site._lock:
+                    site.in_flight += 1
+                    site.max_in_flight = max(site.max_in_flight, site.in_flight)
+                try:
+                    time.sleep(site.response_delay)
+                    site.respond(self)
+                finally:
+                    with site._lock:
+                        site.in_flight -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}{path}"
+
+    def respond(self, handler: BaseHTTPRequestHandler) -> None:
+        body = self.bodies.get(handler.path)
+        if body is None:
+            handler.send_response(404)
+            handler.end_headers()
+            return
+
+        if handler.path.startswith("/validated/"):
+            etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+            if handler.headers.get("If-None-Match") == etag:
+                handler.send_response(304)
+                handler.end_headers()
+                return
+            handler.send_response(200)
+            handler.send_header("ETag", etag)
+            handler.send_header("Last-Modified", LAST_MODIFIED)
+        else:
+            handler.send_response(200)
+
+        handler.send_header("Content-Type", "text/html; charset=utf-8")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def site(monkeypatch):
+    monkeypatch.setattr(settings, "CRAWL_PER_HOST_DELAY", 0.0)
+    monkeypatch.setattr(settings, "CRAWL_URL_PATTERN", None)
+    stub = StubSite()
+    yield stub
+    stub.close()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return FetchCache(str(tmp_path / "crawl_cache.json"))
+
+
+def test_not_modified_page_yields_no_documents(site, cache):
+    site.bodies["/validated/a"] = page("Primeira versão")
+    url = site.url("/validated/a")
+
+    first = crawl_sync(cache, seeds=[url], sitemaps=[])
+    assert first.documents and first.changed_urls == [url]
+    assert cache.entries[url].etag and cache.entries[url].last_modified == LAST_MODIFIED
+
+    second = crawl_sync(cache, seeds=[url], sitemaps=[])
+    assert second.documents == []
+    assert second.stats["not_modified"] == 1
+
+
+def test_identical_body_without_validators_is_unchanged(site, cache):
+    site.bodies["/plain/a"] = page("Sem validadores")
+    url = site.url("/plain/a")
+
+    crawl_sync(cache, seeds=[url], sitemaps=[])
+    second = crawl_sync(cache, seeds=[url], sitemaps=[])
+
+    assert second.documents == []
+    assert second.stats == {"fetched": 1, "not_modified": 0, "unchanged": 1, "failed": 0}
+
+
+@pytest.mark.parametrize("path", ["/validated/a", "/plain/a"])
+def test_changed_body_yields_documents(site, cache, path):
+    site.bodies[path] = page("Primeira versão")
+    url = site.url(path)
+    crawl_sync(cache, seeds=[url], sitemaps=[])
+
+    site.bodies[path] = page("Segunda versão")
+    second = crawl_sync(cache, seeds=[url], sitemaps=[])
+
+    assert second.changed_urls == [url]
+    assert "Segunda versão" in second.documents[0].page_content
+
+
+def test_per_host_concurrency_is_respected(site, cache, monkeypatch):
+    monkeypatch.setattr(settings, "CRAWL_PER_HOST_CONCURRENCY", 2)
+    monkeypatch.setattr(settings, "CRAWL_MAX_CONCURRENCY", 8)
+    site.response_delay = 0.05
+    urls = []
+    for i in range(8):
+        site.bodies[f"/plain/{i}"] = page(f"Página {i}")
+        urls.append(site.url(f"/plain/{i}"))
+
+    result = crawl_sync(cache, seeds=urls, sitemaps=[])
+
+    assert result.stats["fetched"] == 8
+    assert site.max_in_flight == 2
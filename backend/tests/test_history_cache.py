@@ -0,0 +1,51 @@
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.db.history_cache import HistoryCache, SessionWindow
+from app.settings import Settings
+
+
+def window(total: int) -> SessionWindow:
+    return SessionWindow(total, [HumanMessage(content=f"m{i}") for i in range(total)])
+
+
+def test_cache_is_off_by_default():
+    # The declared default, not the live settings, which a local .env may override
+    assert Settings.model_fields["HISTORY_CACHE_SESSIONS"].default == 0
+
+
+def test_disabled_cache_never_serves_a_window():
+    cache = HistoryCache(max_sessions=0, window=4, ttl=300)
+    cache.put("session", window(2))
+    cache.append("session", [AIMessage(content="a")])
+
+    assert cache.get("session") is None
+
+
+def test_writes_through_this_worker_keep_the_window_current():
+    cache = HistoryCache(max_sessions=10, window=4, ttl=300)
+    cache.put("session", window(6))
+    cache.append("session", [HumanMessage(content="q"), AIMessage(content="a")])
+
+    cached = cache.get("session")
+    assert cached.total == 8
+    assert [message.content for message in cached.messages] == ["m4", "m5", "q", "a"]
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    cache = HistoryCache(max_sessions=10, window=4, ttl=300)
+    cache.put("session", window(2))
+
+    loaded_at = cache._entries["session"].loaded_at
+    monkeypatch.setattr("app.db.history_cache.time.monotonic", lambda: loaded_at + 301)
+    assert cache.get("session") is None
+
+
+def test_least_recently_used_session_is_evicted():
+    cache = HistoryCache(max_sessions=2, window=4, ttl=300)
+    cache.put("a", window(1))
+    cache.put("b", window(1))
+    cache.get("a")
+    cache.put("c", window(1))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
@@ -0,0 +1,77 @@
+import pytest
+from langchain_core.documents import Document
+
+from app.ingestion import embedder, pdf_loader
+from app.ingestion.checkpoint import IngestionRun
+from app.ingestion.crawler import CrawlResult
+from app.settings import settings
+
+
+@pytest.fixture(autouse=True)
+def runs_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "INGESTION_RUNS_DIR", str(tmp_path / "runs"))
+
+
+def test_chunks_are_reused_only_for_the_same_sources():
+    run = IngestionRun.create()
+    chunks = [Document(page_content="texto", metadata={"source": "a.pdf"})]
+    run.save_chunks(chunks, ["id-0"], batch_size=50, sources=["web", "a.pdf"])
+
+    resumed = IngestionRun.load()
+    assert resumed.has_chunks(["a.pdf", "web"])
+    assert not resumed.has_chunks(["a.pdf", "b.pdf", "web"])
+    assert not resumed.has_chunks(["web"])
+
+
+def test_chunk_files_from_before_source_tracking_are_not_reused():
+    run = IngestionRun.create()
+    run.save_chunks([Document(page_content="texto")], ["id-0"], batch_size=50, sources=["a.pdf"])
+    del run.manifest["chunk_sources"]
+    run.save()
+
+    assert not IngestionRun.load().has_chunks(["a.pdf"])
+
+
+class RecordingVectorStore:
+    def __init__(self):
+        self.stored: dict[str, Document] = {}
+        self.error: Exception | None = None
+
+    def add_documents(self, documents, ids):
+        if self.error is not None:
+            raise self.error
+        self.stored.update(zip(ids, documents))
+
+
+def test_resume_embeds_a_pdf_that_failed_in_the_first_attempt(tmp_path, monkeypatch):
+    pdf_dir = tmp_path / "pdfs"
+    pdf_dir.mkdir()
+    for name in ("a.pdf", "b.pdf"):
+        (pdf_dir / name).write_bytes(b"%PDF-1.4")
+
+    failing = {"b.pdf"}
+
+    def load_pdf(path, stats):
+        name = path.rsplit("/", 1)[-1]
+        if name in failing:
+            raise RuntimeError("parse error")
+        return [Document(page_content=f"conteúdo de {name}", metadata={"source": name})]
+
+    store = RecordingVectorStore()
+    monkeypatch.setattr(settings, "CRAWL_CACHE_PATH", str(tmp_path / "crawl_cache.json"))
+    monkeypatch.setattr(pdf_loader, "load_pdf", load_pdf)
+    monkeypatch.setattr(embedder, "crawl_sync", lambda cache: CrawlResult())
+    monkeypatch.setattr(embedder, "get_vector_store", lambda: store)
+    monkeypatch.setattr(embedder, "delete_stale_chunks", lambda sources, ids: 0)
+
+    # First attempt: b.pdf fails to parse, then embedding fails before anything is stored
+    store.error = RuntimeError("quota")
+    with pytest.raises(RuntimeError, match="quota"):
+        embedder.ingest_all_documents(str(pdf_dir))
+
+    failing.clear()
+    store.error = None
+    report = embedder.ingest_all_documents(str(pdf_dir), resume="latest")
+
+    assert report["status"] == "completed"
+    assert {doc.metadata["source"] for doc in store.stored.values()} == {"a.pdf", "b.pdf"}
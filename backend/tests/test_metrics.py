@@ -0,0 +1,17 @@
+import statistics
+
+import pytest
+
+from app.metrics import percentile
+
+
+@pytest.mark.parametrize("percent", [1, 50, 90, 99])
+def test_percentile_matches_inclusive_quantiles(percent):
+    values = [float(value) for value in (7, 1, 3, 9, 4, 4, 12, 0.5, 6, 8, 2)]
+    expected = statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+    assert percentile(values, percent) == pytest.approx(expected)
+
+
+def test_percentile_of_small_samples():
+    assert percentile([], 50) is None
+    assert percentile([3.0], 99) == 3.0
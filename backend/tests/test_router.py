@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.agents import coffee_agent
+from app.agents.router import ROUTED_REPLY_NAME, Route, route_message
+from app.db import session_manager
+from app.db.history_cache import HistoryCache, SessionWindow
+from app.settings import settings
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        "Quem foi o presidente que criou o Convênio de Taubaté?",
+        "What was the government role in the 1906 valorization?",
+        "Qual o tamanho da copa de um pé de café?",
+    ],
+)
+def test_coffee_history_questions_reach_the_agent(message):
+    assert route_message(message).kind == "agent"
+
+
+def test_follow_up_without_coffee_words_reaches_the_agent():
+    route = route_message("and the president back then?", has_history=lambda: True)
+    assert route.kind == "agent"
+
+
+def test_off_topic_first_turn_is_short_circuited():
+    route = route_message("Qual o melhor time de futebol do Brasil?", has_history=lambda: False)
+    assert route.kind == "off_topic"
+    assert route.topic == "esportes"
+
+
+def test_off_topic_follow_up_goes_to_the_agent():
+    assert route_message("What about football?", has_history=lambda: True).kind == "agent"
+
+
+def test_history_is_only_checked_for_off_topic_messages():
+    def has_history():
+        raise AssertionError("history lookup for a message that doesn't look off-topic")
+
+    assert route_message("Como é feita a torra do café?", has_history=has_history).kind == "agent"
+    assert route_message("Oi, tudo bem?", has_history=has_history).kind == "greeting"
+
+
+@pytest.fixture
+def places_enabled(monkeypatch):
+    monkeypatch.setattr(settings, "GPLACES_API_KEY", "test")
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        "cafés em grão ou moído?",
+        "Where do I buy coffee in whole bean form?",
+        "Where can I buy coffee in bulk?",
+        "Onde comprar café no atacado?",
+        "Where to drink coffee in Brazil during harvest season?",
+    ],
+)
+def test_coffee_questions_are_not_read_as_places_lookups(places_enabled, message):
+    assert route_message(message).kind == "agent"
+
+
+@pytest.mark.parametrize(
+    "message, location",
+    [
+        ("Onde tomar café em Belo Horizonte?", "Belo Horizonte"),
+        ("Where can I buy coffee in São Paulo?", "São Paulo"),
+    ],
+)
+def test_places_lookup_keeps_the_location(places_enabled, message, location):
+    route = route_message(message)
+    assert route.kind == "places" and route.location == location
+
+
+def test_empty_places_results_fall_back_to_the_agent(monkeypatch):
+    monkeypatch.setattr(coffee_agent, "search_coffee_shops", lambda location: [])
+    route = Route(kind="places", language="pt", location="Atacado")
+
+    assert asyncio.run(coffee_agent.answer_routed(route)) is None
+
+
+def test_router_replies_do_not_count_as_history(monkeypatch):
+    cache = HistoryCache(max_sessions=10, window=20, ttl=300)
+    monkeypatch.setattr(session_manager, "history_cache", cache)
+    greeting = [HumanMessage(content="Oi"), AIMessage(content="Olá! ☕", name=ROUTED_REPLY_NAME)]
+    cache.put("session", SessionWindow(2, greeting))
+
+    history = session_manager.ChatHistory("session")
+    assert not history.has_replies(excluding_name=ROUTED_REPLY_NAME)
+
+    cache.append("session", [HumanMessage(content="E a torra?"), AIMessage(content="A torra...")])
+    assert history.has_replies(excluding_name=ROUTED_REPLY_NAME)
@@ -0,0 +1,150 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.metrics import metrics
+from app.singleflight import SingleFlight
+
+
+class CountingBackend:
+    """Stub upstream that counts calls and blocks until released."""
+
+    def __init__(self, result="result", error: Exception | None = None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        assert self.release.wait(5), "backend was never released"
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def wait_for_coalesced(name: str, count: int) -> None:
+    deadline = time.monotonic() + 5
+    while metrics.counter(f"singleflight.{name}.coalesced") < count:
+        assert time.monotonic() < deadline, "callers never joined the in-flight call"
+        time.sleep(0.001)
+
+
+def run_concurrently(flight: SingleFlight, backend: CountingBackend, callers: int) -> list:
+    outcomes = [None] * callers
+
+    def call(index: int) -> None:
+        try:
+            outcomes[index] = flight.do("key", backend)
+        except Exception as e:
+            outcomes[index] = e
+
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(callers)]
+    threads[0].start()
+    while backend.calls == 0:
+        time.sleep(0.001)
+    for thread in threads[1:]:
+        thread.start()
+
+    wait_for_coalesced(flight.name, callers - 1)
+    backend.release.set()
+    for thread in threads:
+        thread.join(5)
+    return outcomes
+
+
+def test_concurrent_calls_share_one_upstream_call():
+    flight = SingleFlight("test-do-shared")
+    backend = CountingBackend()
+
+    outcomes = run_concurrently(flight, backend, callers=8)
+
+    assert backend.calls == 1
+    assert outcomes == ["result"] * 8
+
+
+def test_exception_reaches_every_waiter():
+    flight = SingleFlight("test-do-error")
+    error = RuntimeError("upstream down")
+    backend = CountingBackend(error=error)
+
+    outcomes = run_concurrently(flight, backend, callers=4)
+
+    assert backend.calls == 1
+    assert all(outcome is error for outcome in outcomes)
+
+
+def test_finished_calls_are_not_cached():
+    flight = SingleFlight("test-do-not-cached")
+    backend = CountingBackend()
+    backend.release.set()
+
+    flight.do("key", backend)
+    flight.do("key", backend)
+
+    assert backend.calls == 2
+
+
+class AsyncBackend:
+    """Async stub upstream that counts calls and waits until released."""
+
+    def __init__(self):
+        self.calls = 0
+        self.cancelled = False
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return "result"
+
+
+def test_cancelling_one_waiter_leaves_the_others_running():
+    asyncio.run(_cancel_one_waiter())
+
+
+async def _cancel_one_waiter():
+    flight = SingleFlight("test-ado-cancel-one")
+    backend = AsyncBackend()
+
+    waiters = [asyncio.create_task(flight.ado("key", backend)) for _ in range(3)]
+    await asyncio.sleep(0)
+    waiters[0].cancel()
+    await asyncio.sleep(0)
+    backend.release.set()
+
+    with pytest.raises(asyncio.CancelledError):
+        await waiters[0]
+    assert await asyncio.gather(*waiters[1:]) == ["result", "result"]
+    assert backend.calls == 1
+    assert not backend.cancelled
+
+
+def test_cancelling_the_last_waiter_cancels_the_upstream_call():
+    asyncio.run(_cancel_every_waiter())
+
+
+async def _cancel_every_waiter():
+    flight = SingleFlight("test-ado-cancel-all")
+    backend = AsyncBackend()
+
+    waiters = [asyncio.create_task(flight.ado("key", backend)) for _ in range(2)]
+    await asyncio.sleep(0)
+    for waiter in waiters:
+        waiter.cancel()
+    await asyncio.gather(*waiters, return_exceptions=True)
+    await asyncio.sleep(0)
+
+    assert backend.calls == 1
+    assert backend.cancelled
+
+    # A new caller starts a fresh call instead of joining the abandoned one
+    backend.release.set()
+    assert await flight.ado("key", backend) == "result"
+    assert backend.calls == 2
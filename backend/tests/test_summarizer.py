@@ -0,0 +1,55 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.agents import summarizer
+from app.db.history_cache import SessionWindow
+from app.settings import settings
+
+
+class FakeSummaryLLM:
+    def __init__(self):
+        self.prompts = []
+
+    async def ainvoke(self, prompt):
+        self.prompts.append(prompt)
+        return AIMessage(content="new summary")
+
+
+def test_update_summary_reads_only_unsummarized_messages(monkeypatch):
+    history = [
+        message
+        for turn in range(10)
+        for message in (HumanMessage(content=f"q{turn}"), AIMessage(content=f"a{turn}"))
+    ]
+    reads, saved = [], []
+    llm = FakeSummaryLLM()
+
+    def load_from(session_id, start):
+        reads.append(start)
+        return SessionWindow(len(history), history[start:])
+
+    monkeypatch.setattr(summarizer, "get_session_summary", lambda session_id: ("old summary", 12))
+    monkeypatch.setattr(summarizer, "_load_history_from", load_from)
+    monkeypatch.setattr(summarizer, "save_session_summary", lambda *args: saved.append(args))
+    monkeypatch.setattr(summarizer, "get_summary_llm", lambda: llm)
+
+    asyncio.run(summarizer.update_summary("session"))
+
+    fold_until = len(history) - settings.HISTORY_RECENT_MESSAGES
+    assert reads == [12]
+    assert saved == [("session", "new summary", fold_until)]
+    assert "User: q6" in llm.prompts[0] and "Assistant: a7" in llm.prompts[0]
+    assert "q5" not in llm.prompts[0] and "q8" not in llm.prompts[0]
+
+
+def test_update_summary_skips_when_too_few_messages_left_the_window(monkeypatch):
+    history = [HumanMessage(content="q"), AIMessage(content="a")] * 3
+
+    monkeypatch.setattr(summarizer, "get_session_summary", lambda session_id: ("old summary", 1))
+    monkeypatch.setattr(
+        summarizer, "_load_history_from", lambda session_id, start: SessionWindow(len(history), history[start:])
+    )
+    monkeypatch.setattr(summarizer, "get_summary_llm", lambda: None)  # Any call would fail
+
+    asyncio.run(summarizer.update_summary("session"))